@@ -0,0 +1,163 @@
+"""
+Admission Control — keeps overload graceful instead of letting every request
+slow down together:
+
+- AdmissionGate bounds how many upstream (Gemini) operations run at once.
+  Callers beyond the limit wait in a short priority queue (interactive chat
+  ahead of bulk retrieval); when the queue is full, or a caller has waited
+  longer than max_wait, it is rejected at once with Overloaded.
+- RateLimiter gives each key (a citizen's phone number) its own token
+  bucket and rejects requests over the rate with Overloaded.
+
+Overloaded carries an HTTP status (429 or 503) and a Retry-After estimate;
+the API turns it into a fast error response.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+import tracing
+from caches import TTLCache
+from embedding_pipeline import TokenBucket
+
+# Queue priorities: lower is served first
+CHAT = 0
+BULK = 1
+
+
+class Overloaded(Exception):
+    """A request was shed; `reason` is rate_limit, queue_full or queue_timeout."""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{reason} (retry after {retry_after}s)")
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionGate:
+    """At most `limit` concurrent slots, with a bounded priority wait queue."""
+
+    def __init__(self, limit: int = 8, max_queue: int = 32, max_wait: float = 5.0):
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiters: list[list] = []  # heap of [priority, seq, future]
+        self._seq = itertools.count()
+        self._hold = 1.0  # moving average of slot hold time, for Retry-After
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Rough seconds until a new caller would get a slot, from the recent hold time."""
+        return max(1, min(60, math.ceil(self._hold * (len(self._waiters) + 1) / self.limit)))
+
+    async def acquire(self, priority: int = CHAT) -> None:
+        """Take a slot, waiting up to max_wait; raises Overloaded if the queue is full or the wait times out."""
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(503, self.retry_after(), "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait([future], timeout=self.max_wait)
+        except BaseException:
+            self._abandon(entry)
+            raise
+        finally:
+            tracing.record("queue", time.perf_counter() - start)
+        if not future.done():
+            self._abandon(entry)
+            self.timed_out += 1
+            raise Overloaded(503, self.retry_after(), "queue_timeout")
+        self.admitted += 1
+
+    def _abandon(self, entry: list) -> None:
+        """Leave the queue; a slot handed over in the meantime is passed on."""
+        future = entry[2]
+        if future.done():
+            self.release()
+            return
+        future.cancel()
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+    def release(self) -> None:
+        """Hand the slot to the best waiter, or free it."""
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = CHAT):
+        """`async with gate.slot():` — hold one slot for the block."""
+        await self.acquire(priority)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold += 0.2 * (time.monotonic() - start - self._hold)
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class RateLimiter:
+    """Per-key token buckets: `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        # Buckets are re-stored on every check, so one is only evicted after
+        # being idle for at least burst / rate seconds — by then it is full anyway
+        self._buckets = TTLCache(max_size=max_keys, ttl=max(60.0, burst / rate))
+        self.limited = 0
+
+    def check(self, key: Hashable) -> None:
+        """Spend one request for `key`; raises Overloaded (429) when over the rate."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+        self._buckets.set(key, bucket)
+        if not bucket.try_acquire():
+            self.limited += 1
+            raise Overloaded(429, max(1, math.ceil(bucket.wait_time())), "rate_limit")
+
+    def stats(self) -> dict:
+        return {"rate_per_min": self.rate * 60, "burst": self.burst, "tracked": len(self._buckets), "limited": self.limited}
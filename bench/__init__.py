@@ -0,0 +1 @@
+"""Offline load-testing benchmarks (see bench/run.py)."""
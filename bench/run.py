@@ -0,0 +1,411 @@
+"""
+Offline load test — starts the app (bench/serve.py) against the stub Gemini
+client and drives mixed traffic from simulated citizens: each one starts a
+session, then clicks through the browse menus (/api/chat) and asks free-text
+questions (/api/ai-chat, /api/ai-chat/stream).
+
+Reports p50/p95/p99 latency and throughput per endpoint, server memory and
+the server-side stage breakdown from /metrics, and saves the results as JSON
+in bench/results/ for comparison across commits.
+
+Usage:
+    python -m bench.run --users 50 --duration 30
+    python -m bench.run --gen-latency-ms 1500 --error-rate 0.02
+    python -m bench.run --compare bench/results/<earlier-run>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+
+OFF_TOPIC_QUESTIONS = [
+    "what is the weather in imphal today",
+    "how do i apply for a passport",
+    "can you help me with my electricity bill",
+    "who is the chief minister of manipur",
+    "is the office open on saturday",
+]
+
+
+# ─── Traffic ──────────────────────────────────────────────────────────────────
+
+def _question_pool() -> list[str]:
+    """Free-text questions: KB questions with paraphrase noise, plus off-topic ones."""
+    sys.path.insert(0, ROOT)
+    import kb_loader
+
+    pool = []
+    for entry in kb_loader.load_knowledge_base():
+        q = entry["question"]
+        pool.append(q)
+        pool.append(q.lower().rstrip("?"))
+        words = q.split()
+        if len(words) > 4:
+            pool.append("please tell me " + " ".join(words[1:]).lower())
+    return pool + OFF_TOPIC_QUESTIONS
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, endpoint: str, seconds: float, ok: bool) -> None:
+        if not self.recording:
+            return
+        if ok:
+            self.samples[endpoint].append(seconds)
+        else:
+            self.errors[endpoint] += 1
+
+
+async def _call(client: httpx.AsyncClient, rec: Recorder, endpoint: str, path: str, body: dict) -> Optional[dict]:
+    start = time.perf_counter()
+    try:
+        if endpoint == "ai_chat_stream":
+            async with client.stream("POST", path, json=body) as r:
+                async for _ in r.aiter_raw():
+                    pass
+            ok, data = r.status_code == 200, None
+        else:
+            r = await client.post(path, json=body)
+            ok = r.status_code == 200
+            data = r.json() if ok else None
+    except httpx.HTTPError:
+        ok, data = False, None
+    rec.add(endpoint, time.perf_counter() - start, ok)
+    return data
+
+
+async def _citizen(client, rec, rng: random.Random, questions, weights, args, deadline: float) -> None:
+    """One simulated user: repeated journeys of session start, browse clicks and questions."""
+    n = 0
+    while time.monotonic() < deadline:
+        n += 1
+        phone = f"9{rng.randrange(10**9):09d}"
+        started = await _call(
+            client, rec, "session_start", "/api/session/start",
+            {"user_info": {"name": f"Bench User {n}", "phone": phone}},
+        )
+        if started is None:
+            await asyncio.sleep(0.1)
+            continue
+        sid = started["session_id"]
+        view = started
+
+        for _ in range(rng.randint(args.min_steps, args.max_steps)):
+            if time.monotonic() >= deadline:
+                return
+            if args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+
+            roll = rng.random()
+            if roll < args.browse_ratio:
+                body = _next_click(rng, sid, view)
+                data = await _call(client, rec, "chat", "/api/chat", body)
+                view = data or view
+            else:
+                # Zipf-like popularity so repeated questions hit the caches
+                message = rng.choices(questions, weights=weights)[0]
+                endpoint = "ai_chat_stream" if roll >= 1 - args.stream_ratio else "ai_chat"
+                path = "/api/ai-chat/stream" if endpoint == "ai_chat_stream" else "/api/ai-chat"
+                await _call(client, rec, endpoint, path, {"session_id": sid, "message": message})
+
+
+def _next_click(rng: random.Random, sid: str, view: dict) -> dict:
+    """Pick a plausible browse action for the menu the user is looking at."""
+    state = view.get("state")
+    if state == "service_selection" and view.get("services"):
+        return {"session_id": sid, "action": "select_service", "value": rng.choice(view["services"])}
+    if state == "category_selection" and view.get("categories") and rng.random() < 0.9:
+        return {"session_id": sid, "action": "select_category", "value": rng.choice(view["categories"])}
+    if state == "question_selection" and view.get("questions") and rng.random() < 0.9:
+        return {"session_id": sid, "action": "select_question", "value": rng.choice(view["questions"])["id"]}
+    return {"session_id": sid, "action": "back"}
+
+
+# ─── Server ───────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(args, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "BENCH_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+        "BENCH_GEN_LATENCY_MS": str(args.gen_latency_ms),
+        "BENCH_STREAM_CHUNKS": str(args.stream_chunks),
+        "BENCH_ERROR_RATE": str(args.error_rate),
+        "BENCH_REJECT_CACHE": "1" if args.reject_cache else "0",
+        "BENCH_SEED": str(args.seed),
+        # Nothing in a benchmark run is slow enough to be worth logging
+        "SLOW_REQUEST_MS": env.get("SLOW_REQUEST_MS", "1e9"),
+    })
+    log = open(os.path.join(RESULTS_DIR, "server.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "bench.serve", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process (Linux /proc only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def _wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}; see {RESULTS_DIR}/server.log")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout:.0f}s; see {RESULTS_DIR}/server.log")
+
+
+async def _sample_memory(pid: int, samples: list[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = _rss_bytes(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+_STAGE_RE = re.compile(r'^eseba_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def _stage_breakdown(metrics_text: str) -> dict:
+    """Mean server-side milliseconds per pipeline stage, from the Prometheus text."""
+    sums, counts = {}, {}
+    for line in metrics_text.splitlines():
+        m = _STAGE_RE.match(line)
+        if m:
+            (sums if m.group(1) == "sum" else counts)[m.group(2)] = float(m.group(3))
+    return {
+        stage: {"count": int(counts[stage]), "mean_ms": round(sums[stage] / counts[stage] * 1000, 3)}
+        for stage in sorted(counts)
+        if counts[stage] and stage in sums
+    }
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+
+def _summarise(rec: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint in sorted(set(rec.samples) | set(rec.errors)):
+        lat = np.array(rec.samples.get(endpoint, []), dtype=float) * 1000
+        endpoints[endpoint] = {
+            "requests": int(lat.size),
+            "errors": rec.errors.get(endpoint, 0),
+            "rps": round(lat.size / elapsed, 2),
+            "p50_ms": round(float(np.percentile(lat, 50)), 2) if lat.size else None,
+            "p95_ms": round(float(np.percentile(lat, 95)), 2) if lat.size else None,
+            "p99_ms": round(float(np.percentile(lat, 99)), 2) if lat.size else None,
+            "max_ms": round(float(lat.max()), 2) if lat.size else None,
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+
+def _git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except OSError:
+        return "unknown"
+
+
+def _print_report(result: dict, baseline: Optional[dict]) -> None:
+    s = result["summary"]
+    print(f"\n{result['revision']}  {s['requests']} requests in {s['elapsed_s']}s = {s['rps']} req/s, {s['errors']} errors")
+    header = f"{'endpoint':<16}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    base_eps = (baseline or {}).get("summary", {}).get("endpoints", {})
+    for name, e in s["endpoints"].items():
+        print(f"{name:<16}{e['requests']:>8}{e['errors']:>6}{e['rps']:>9}{e['p50_ms'] or 0:>10}{e['p95_ms'] or 0:>10}{e['p99_ms'] or 0:>10}")
+        b = base_eps.get(name)
+        if b and b.get("p50_ms"):
+            deltas = [
+                f"{(e[k] - b[k]) / b[k] * 100:+.0f}%" if e[k] is not None and b.get(k) else "n/a"
+                for k in ("rps", "p50_ms", "p95_ms", "p99_ms")
+            ]
+            print(f"{'  vs baseline':<30}{deltas[0]:>9}{deltas[1]:>10}{deltas[2]:>10}{deltas[3]:>10}")
+
+    mem = result["memory"]
+    if mem["peak_bytes"]:
+        print(f"\nserver RSS: start {mem['start_bytes'] / 2**20:.1f} MiB, peak {mem['peak_bytes'] / 2**20:.1f} MiB, end {mem['end_bytes'] / 2**20:.1f} MiB")
+    if result["stages"]:
+        print("server stages (mean ms): " + ", ".join(f"{k} {v['mean_ms']}" for k, v in result["stages"].items()))
+    if baseline:
+        print(f"baseline: {baseline.get('revision')} ({baseline.get('timestamp')}), "
+              f"{baseline['summary']['rps']} req/s -> {s['rps']} req/s")
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+async def _run(args) -> dict:
+    port = args.port or _free_port()
+    proc = _start_server(args, port)
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await _wait_ready(client, proc, args.startup_timeout)
+            start_rss = _rss_bytes(proc.pid)
+
+            questions = _question_pool()
+            weights = [1 / (rank + 1) for rank in range(len(questions))]
+            random.Random(args.seed).shuffle(questions)
+
+            rec = Recorder()
+            rss_samples: list[int] = []
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(_sample_memory(proc.pid, rss_samples, stop))
+
+            deadline = time.monotonic() + args.warmup + args.duration
+            users = [
+                asyncio.create_task(
+                    _citizen(client, rec, random.Random(args.seed * 1000 + i), questions, weights, args, deadline)
+                )
+                for i in range(args.users)
+            ]
+            await asyncio.sleep(args.warmup)
+            rec.recording = True
+            started = time.perf_counter()
+            await asyncio.gather(*users)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await sampler
+
+            metrics_text = (await client.get("/metrics")).text
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "label": args.label,
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "users", "duration", "warmup", "think_ms", "browse_ratio", "stream_ratio",
+                "min_steps", "max_steps", "embed_latency_ms", "gen_latency_ms", "stream_chunks",
+                "error_rate", "reject_cache", "seed",
+            )
+        },
+        "env": {k: v for k, v in os.environ.items() if k in _APP_ENV},
+        "summary": _summarise(rec, elapsed),
+        "memory": {
+            "start_bytes": start_rss,
+            "peak_bytes": max(rss_samples, default=None),
+            "end_bytes": rss_samples[-1] if rss_samples else None,
+        },
+        "stages": _stage_breakdown(metrics_text),
+    }
+
+
+# App settings worth recording with each result, since they change performance
+_APP_ENV = {
+    "VECTOR_BACKEND", "RETRIEVAL_MODE", "SESSION_BACKEND", "DIRECT_ANSWERS", "ANSWER_CACHE_SIZE",
+    "ANSWER_CACHE_SIMILARITY", "EMBED_CACHE_SIZE", "CHROMA_QUERY_WORKERS", "MAX_SESSIONS", "EMBED_BACKEND",
+    "PROMPT_CACHE",
+}
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated citizens")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's actions (0 = closed loop)")
+    parser.add_argument("--browse-ratio", type=float, default=0.6, help="share of actions that are /api/chat clicks")
+    parser.add_argument("--stream-ratio", type=float, default=0.1, help="share of actions that use the streaming endpoint")
+    parser.add_argument("--min-steps", type=int, default=3, help="fewest actions per session")
+    parser.add_argument("--max-steps", type=int, default=12, help="most actions per session")
+    parser.add_argument("--embed-latency-ms", type=float, default=40, help="stub embedding latency")
+    parser.add_argument("--gen-latency-ms", type=float, default=800, help="stub generation latency (whole answer)")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="chunks per streamed answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability a stub call fails with 503")
+    parser.add_argument(
+        "--reject-cache", action="store_true",
+        help="stub rejects generation calls that reference a context cache (with PROMPT_CACHE=1)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0, help="server port (default: a free one)")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--label", default="", help="free-form note stored with the result")
+    parser.add_argument("--output", help="result file (default: bench/results/<timestamp>-<revision>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    if args.browse_ratio + args.stream_ratio > 1:
+        parser.error("--browse-ratio + --stream-ratio must not exceed 1")
+    if args.min_steps > args.max_steps:
+        parser.error("--min-steps must not exceed --max-steps")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    result = asyncio.run(_run(args))
+
+    out_path = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['revision']}.json"
+    )
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    _print_report(result, baseline)
+    print(f"\nSaved {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Run the app under uvicorn with the stub Gemini client installed and a
+throwaway Chroma directory. Started as a subprocess by bench/run.py:
+
+    python -m bench.serve --port 8765
+
+Stub behaviour comes from BENCH_* environment variables (see StubConfig);
+all other app settings (VECTOR_BACKEND, SESSION_BACKEND, ...) are read from
+the environment as usual.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _install_stub() -> None:
+    """Point the app at the stub client and a fresh Chroma directory; import before main."""
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)  # main.py serves static/ relative to the working directory
+
+    import gemini_client
+    import knowledge_store
+    from bench.stub_genai import StubClient
+
+    gemini_client._client = StubClient()
+    knowledge_store.CHROMA_DIR = os.getenv("BENCH_CHROMA_DIR") or tempfile.mkdtemp(prefix="eseba-bench-chroma-")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    _install_stub()
+    import uvicorn
+    import main as app_main
+
+    uvicorn.run(app_main.app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Stub google-genai client for benchmarks — implements the parts of
+`genai.Client` the app uses (embed_content, generate_content,
+generate_content_stream and the context-cache API, sync and async) with
+configurable latency, a configurable number of stream chunks, random
+error injection and optional rejection of cached-content references, so
+load tests spend no Gemini quota. Like the real SDK, a streaming call only
+sends its request (and so fails) on the first iteration.
+
+Embeddings are deterministic hashed bag-of-words vectors, so retrieval,
+caching and direct answers behave realistically for the generated traffic.
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+EMBED_DIM = 768
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class StubConfig:
+    """
+    Latencies in seconds; error_rate is the probability a call fails with a
+    503; reject_cache makes generation calls that reference a context cache
+    fail with a 404, as if the cache had expired upstream.
+    """
+
+    def __init__(
+        self,
+        embed_latency: float = 0.04,
+        generate_latency: float = 0.8,
+        stream_chunks: int = 8,
+        error_rate: float = 0.0,
+        reject_cache: bool = False,
+        seed: Optional[int] = None,
+    ):
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.stream_chunks = max(1, stream_chunks)
+        self.error_rate = error_rate
+        self.reject_cache = reject_cache
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls) -> "StubConfig":
+        return cls(
+            embed_latency=float(os.getenv("BENCH_EMBED_LATENCY_MS", "40")) / 1000,
+            generate_latency=float(os.getenv("BENCH_GEN_LATENCY_MS", "800")) / 1000,
+            stream_chunks=int(os.getenv("BENCH_STREAM_CHUNKS", "8")),
+            error_rate=float(os.getenv("BENCH_ERROR_RATE", "0")),
+            reject_cache=os.getenv("BENCH_REJECT_CACHE", "0") == "1",
+            seed=int(os.getenv("BENCH_SEED", "0")),
+        )
+
+
+class StubAPIError(Exception):
+    """Mimics a transient upstream error (HTTP 503 UNAVAILABLE)."""
+
+    code = 503
+
+    def __init__(self):
+        super().__init__("503 UNAVAILABLE (injected by benchmark stub)")
+
+
+class StubCacheNotFound(Exception):
+    """Mimics a generation request referencing an expired or deleted context cache."""
+
+    code = 404
+
+    def __init__(self, name: str):
+        super().__init__(f"404 NOT_FOUND cachedContent {name} not found (injected by benchmark stub)")
+
+
+def _embed(text: str) -> list[float]:
+    vec = np.zeros(EMBED_DIM, dtype=np.float32)
+    words = _WORD_RE.findall(text.lower())
+    for word in words:
+        h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+        vec[h % EMBED_DIM] += 1.0 if h & (1 << 63) else -1.0
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        vec[0] = 1.0
+        norm = 1.0
+    return (vec / norm).tolist()
+
+
+def _as_list(contents) -> list[str]:
+    return [contents] if isinstance(contents, str) else list(contents)
+
+
+def _answer_text(contents) -> str:
+    question = _as_list(contents)[-1][-200:]
+    return (
+        "Thank you for your question. Here is how to proceed on the e-Seba portal: "
+        "log in, open the relevant service, fill in the form and upload the required documents. "
+        f"(stub answer for: {question.strip()[:80]})"
+    )
+
+
+def _usage(contents, text: str, config=None) -> SimpleNamespace:
+    prompt = sum(len(c) for c in _as_list(contents)) // 4
+    cached = 0
+    if config is not None and getattr(config, "cached_content", None):
+        cached = 400  # roughly the system prompt
+        prompt += cached
+    return SimpleNamespace(
+        prompt_token_count=prompt,
+        cached_content_token_count=cached or None,
+        candidates_token_count=len(text) // 4,
+    )
+
+
+class _Models:
+    def __init__(self, config: StubConfig):
+        self.config = config
+
+    def _maybe_fail(self, config=None) -> None:
+        if self.config.error_rate and self.config.rng.random() < self.config.error_rate:
+            raise StubAPIError()
+        cached_content = getattr(config, "cached_content", None)
+        if self.config.reject_cache and cached_content:
+            raise StubCacheNotFound(cached_content)
+
+    def _embed_response(self, contents) -> SimpleNamespace:
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=_embed(t)) for t in _as_list(contents)])
+
+    def _generate_response(self, contents, config=None) -> SimpleNamespace:
+        text = _answer_text(contents)
+        return SimpleNamespace(text=text, usage_metadata=_usage(contents, text, config))
+
+    def embed_content(self, model: str, contents, config=None) -> SimpleNamespace:
+        time.sleep(self.config.embed_latency)
+        self._maybe_fail()
+        return self._embed_response(contents)
+
+    def generate_content(self, model: str, contents, config=None) -> SimpleNamespace:
+        time.sleep(self.config.generate_latency)
+        self._maybe_fail(config)
+        return self._generate_response(contents, config)
+
+
+class _AsyncModels(_Models):
+    async def embed_content(self, model: str, contents, config=None) -> SimpleNamespace:
+        await asyncio.sleep(self.config.embed_latency)
+        self._maybe_fail()
+        return self._embed_response(contents)
+
+    async def generate_content(self, model: str, contents, config=None) -> SimpleNamespace:
+        await asyncio.sleep(self.config.generate_latency)
+        self._maybe_fail(config)
+        return self._generate_response(contents, config)
+
+    async def generate_content_stream(self, model: str, contents, config=None):
+        text = _answer_text(contents)
+        n = self.config.stream_chunks
+        step = -(-len(text) // n)
+        delay = self.config.generate_latency / n
+
+        async def chunks():
+            self._maybe_fail(config)
+            for i in range(n):
+                await asyncio.sleep(delay)
+                last = i == n - 1
+                yield SimpleNamespace(
+                    text=text[i * step : (i + 1) * step],
+                    usage_metadata=_usage(contents, text, config) if last else None,
+                )
+
+        return chunks()
+
+
+class _AsyncCaches:
+    """Explicit context caches: create/update/delete succeed instantly."""
+
+    def __init__(self):
+        self._count = 0
+
+    async def create(self, model: str, config=None) -> SimpleNamespace:
+        self._count += 1
+        return SimpleNamespace(name=f"cachedContents/stub-{self._count}", model=model)
+
+    async def update(self, name: str, config=None) -> SimpleNamespace:
+        return SimpleNamespace(name=name)
+
+    async def delete(self, name: str, config=None) -> None:
+        return None
+
+
+class StubClient:
+    """Drop-in for genai.Client as used by gemini_client/knowledge_store/main."""
+
+    def __init__(self, config: Optional[StubConfig] = None):
+        self.config = config or StubConfig.from_env()
+        self.models = _Models(self.config)
+        self.aio = SimpleNamespace(models=_AsyncModels(self.config), caches=_AsyncCaches(), aclose=self._aclose)
+
+    async def _aclose(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
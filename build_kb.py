@@ -0,0 +1,28 @@
+"""
+Validate data/knowledge_base.json and compile its binary snapshot.
+
+Usage: python build_kb.py [path/to/knowledge_base.json]
+
+Run this whenever the knowledge base content changes (e.g. in the deploy
+pipeline); the server loads the snapshot if it matches the JSON source and
+falls back to parsing the JSON otherwise.
+"""
+
+import sys
+
+import kb_loader
+
+
+def main(argv: list[str]) -> int:
+    json_path = argv[1] if len(argv) > 1 else kb_loader.KB_JSON_PATH
+    try:
+        out_path, count = kb_loader.compile_snapshot(json_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Validated {count} entries and wrote {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
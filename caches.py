@@ -0,0 +1,254 @@
+"""
+Caches — a small thread-safe LRU cache with TTL eviction, hit/miss counters
+and optional persistence (for caches of float32 vectors, as a compact .npz
+file), plus a semantic answer cache built on top of it, used to avoid
+repeated Gemini round-trips.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire `ttl` seconds after insertion."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[0], now):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get(), but does not count as a hit or miss or refresh the entry's LRU position."""
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[0], now):
+                return default
+            return item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    # ─── Persistence ──────────────────────────────────────────────────────────
+
+    def _live_entries(self) -> list[list]:
+        """[key, stored_at, value] for every unexpired entry, oldest first."""
+        now = time.time()
+        with self._lock:
+            return [
+                [key, stored_at, value]
+                for key, (stored_at, value) in self._data.items()
+                if not self._expired(stored_at, now)
+            ]
+
+    def _restore(self, entries) -> int:
+        """Insert (key, stored_at, value) entries, skipping expired ones; returns how many were kept."""
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, stored_at, value in entries:
+                if self._expired(stored_at, now):
+                    continue
+                self._data[key] = (stored_at, value)
+                self._data.move_to_end(key)
+                loaded += 1
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return loaded
+
+    def save_vectors(self, path: str, tag: str = "") -> None:
+        """
+        Write live entries to `path` as one .npz file. Keys must be strings
+        and values equal-length float32 vectors.
+        """
+        entries = self._live_entries()
+        vectors = np.stack([value for _, _, value in entries]) if entries else np.zeros((0, 0), dtype=np.float32)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                tag=np.array(tag),
+                keys=np.array([key for key, _, _ in entries], dtype=str),
+                stored_at=np.array([stored_at for _, stored_at, _ in entries], dtype=np.float64),
+                vectors=vectors.astype(np.float32, copy=False),
+            )
+        os.replace(tmp_path, path)
+
+    def load_vectors(self, path: str, tag: str = "") -> int:
+        """
+        Load entries previously written by save_vectors(). Files written with a
+        different tag are ignored. Returns the number of entries loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path, allow_pickle=False) as payload:
+                if str(payload["tag"]) != tag:
+                    return 0
+                keys, stored_at, vectors = payload["keys"], payload["stored_at"], payload["vectors"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Could not read cache file {path}: {e}")
+            return 0
+        return self._restore(
+            (str(key), float(when), vector) for key, when, vector in zip(keys, stored_at, vectors)
+        )
+
+
+def _unit(embedding) -> Optional[np.ndarray]:
+    """The embedding as a unit-length float32 vector, or None if it is all zeros."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on (normalised message, retrieved KB ids).
+
+    An exact key match is served directly. Otherwise, if `similarity` is set,
+    a cached answer retrieved from the same KB ids whose query embedding has
+    cosine similarity >= `similarity` with the new query is served instead.
+    The embeddings for each id set are kept as one normalised float32 matrix,
+    so a near-duplicate lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: Optional[float] = 3600.0, similarity: Optional[float] = None):
+        self.similarity = similarity
+        self.near_hits = 0
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        # id set -> message -> unit query embedding; may briefly hold entries
+        # the TTLCache has already evicted or expired (pruned lazily)
+        self._groups: dict[frozenset, dict[str, np.ndarray]] = {}
+        self._matrices: dict[frozenset, tuple[list[str], np.ndarray]] = {}
+        self._indexed = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(message: str, ids) -> tuple[str, frozenset]:
+        return (" ".join(message.split()), frozenset(ids))
+
+    def _matrix(self, ids: frozenset) -> Optional[tuple[list[str], np.ndarray]]:
+        """(messages, stacked unit embeddings) for an id set, built on first use after a change."""
+        with self._lock:
+            cached = self._matrices.get(ids)
+            if cached is None:
+                group = self._groups.get(ids)
+                if not group:
+                    return None
+                messages = list(group)
+                cached = self._matrices[ids] = (messages, np.stack([group[m] for m in messages]))
+            return cached
+
+    def _forget(self, ids: frozenset, message: str) -> None:
+        with self._lock:
+            group = self._groups.get(ids)
+            if group is not None and group.pop(message, None) is not None:
+                self._indexed -= 1
+                self._matrices.pop(ids, None)
+                if not group:
+                    del self._groups[ids]
+
+    def _prune(self) -> None:
+        """Drop indexed embeddings whose answers are no longer cached. Call with the lock held."""
+        for ids in list(self._groups):
+            group = {m: v for m, v in self._groups[ids].items() if self._cache.peek((m, ids)) is not None}
+            if group:
+                self._groups[ids] = group
+            else:
+                del self._groups[ids]
+        self._matrices.clear()
+        self._indexed = sum(len(group) for group in self._groups.values())
+
+    def get(self, message: str, ids, embedding=None) -> Optional[str]:
+        key = self._key(message, ids)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        if self.similarity is None or embedding is None:
+            return None
+        query = _unit(embedding)
+        candidates = self._matrix(key[1])
+        if query is None or candidates is None:
+            return None
+
+        messages, matrix = candidates
+        scores = matrix @ query
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] < self.similarity:
+                break
+            answer = self._cache.peek((messages[i], key[1]))
+            if answer is not None:
+                self.near_hits += 1
+                return answer
+            self._forget(key[1], messages[i])  # evicted or expired
+        return None
+
+    def set(self, message: str, ids, answer: str, embedding=None) -> None:
+        key = self._key(message, ids)
+        self._cache.set(key, answer)
+        vector = _unit(embedding) if self.similarity is not None and embedding is not None else None
+        if vector is None:
+            return
+        with self._lock:
+            group = self._groups.setdefault(key[1], {})
+            if key[0] not in group:
+                self._indexed += 1
+            group[key[0]] = vector
+            self._matrices.pop(key[1], None)
+            if self._indexed > 2 * self._cache.max_size:
+                self._prune()
+
+    def clear(self) -> None:
+        self._cache.clear()
+        with self._lock:
+            self._groups.clear()
+            self._matrices.clear()
+            self._indexed = 0
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "near_hits": self.near_hits}
@@ -0,0 +1,117 @@
+"""
+Context Builder — assembles the retrieved KB passages for the generation
+prompt within a token budget: low-scoring and near-duplicate passages are
+dropped, the rest go best-first, and long answers are trimmed to the
+sentences most relevant to the question.
+
+Token counts are estimated (about four characters per token for English
+text); the budget is a size control, not an exact tokenizer count.
+"""
+
+import re
+
+from lexical_index import tokenize
+
+CHARS_PER_TOKEN = 4
+PASSAGE_SEPARATOR = "\n\n---\n\n"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def _split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def trim_answer(answer: str, query_terms: set, max_tokens: int) -> str:
+    """
+    Keep the sentences of `answer` that share the most terms with the query
+    (earlier sentences win ties), in their original order, within max_tokens.
+    The first sentence is always considered, so the answer never comes back empty.
+    """
+    if estimate_tokens(answer) <= max_tokens:
+        return answer
+    sentences = _split_sentences(answer)
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(query_terms & set(tokenize(sentences[i]))), i),
+    )
+    keep, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if keep and used + cost > max_tokens:
+            continue
+        keep.append(i)
+        used += cost
+    text = " ".join(sentences[i] for i in sorted(keep))
+    if estimate_tokens(text) > max_tokens:
+        text = text[: max_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + "…"
+    return text
+
+
+def format_passage(match: dict, answer: str) -> str:
+    return f"Q: {match['question']}\nA: {answer}\n(Service: {match['service']}, Category: {match['category']})"
+
+
+def build_context(
+    matches: list[dict],
+    query: str,
+    token_budget: int = 600,
+    passage_tokens: int = 160,
+    min_score: float = 0.5,
+    dedupe_similarity: float = 0.8,
+) -> dict:
+    """
+    Select and format passages from retrieval matches (dicts with id,
+    question, answer, service, category and score). Matches scoring at or
+    below min_score are dropped; lexical-only matches (score None) are kept
+    after the scored ones, in retrieval order. A passage whose question and
+    answer terms overlap an already selected one by dedupe_similarity
+    (Jaccard) or more is skipped.
+
+    Returns {"text", "matches" (those used, best first), "tokens", "dropped"}.
+    """
+    candidates = [m for m in matches if m["score"] is None or m["score"] > min_score]
+    candidates.sort(key=lambda m: (m["score"] is None, -(m["score"] or 0.0)))
+
+    query_terms = set(tokenize(query))
+    separator_tokens = estimate_tokens(PASSAGE_SEPARATOR)
+    selected, parts, seen_terms = [], [], []
+    used = 0
+    dropped = len(matches) - len(candidates)
+
+    for m in candidates:
+        terms = set(tokenize(m["question"] + " " + m["answer"]))
+        if any(_jaccard(terms, other) >= dedupe_similarity for other in seen_terms):
+            dropped += 1
+            continue
+
+        remaining = token_budget - used - (separator_tokens if parts else 0)
+        overhead = estimate_tokens(format_passage(m, ""))
+        answer_budget = min(passage_tokens, remaining - overhead)
+        if answer_budget < min(passage_tokens, 24):
+            # Not enough room left for a useful passage
+            dropped += 1
+            continue
+
+        passage = format_passage(m, trim_answer(m["answer"], query_terms, answer_budget))
+        used += estimate_tokens(passage) + (separator_tokens if parts else 0)
+        parts.append(passage)
+        selected.append(m)
+        seen_terms.append(terms)
+
+    return {
+        "text": PASSAGE_SEPARATOR.join(parts),
+        "matches": selected,
+        "tokens": used,
+        "dropped": dropped,
+    }
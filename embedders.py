@@ -0,0 +1,126 @@
+"""
+Embedders — the text-embedding backends knowledge_store can use, behind
+one small interface:
+
+- GeminiEmbedder: Gemini's embedding API (default; needs GEMINI_API_KEY).
+- HashingEmbedder: hashed character n-gram features computed locally with
+  NumPy. Deterministic, needs no key or network and embeds the whole
+  knowledge base in milliseconds, for tests, benchmarks, air-gapped
+  deployments and as a degraded-mode fallback when the API is down.
+
+Vectors from different embedders are not comparable, so each embedder's
+`name` keys the stored collection, content hashes and cache files.
+"""
+
+import re
+
+import numpy as np
+
+import gemini_client
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# 64-bit FNV-1a
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+class Embedder:
+    """
+    Interface for embedding backends. `name` identifies the vector space
+    (model + parameters); `max_batch` is the most texts per embed() call;
+    `remote` embedders are rate-limited and retried during ingestion and
+    batch query embedding.
+    """
+
+    name = ""
+    max_batch = 100
+    remote = False
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed up to max_batch texts."""
+        raise NotImplementedError
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        """Async embed(); local embedders simply run inline."""
+        return self.embed(texts)
+
+
+class GeminiEmbedder(Embedder):
+    remote = True
+    max_batch = 100  # Gemini batch embedding request limit
+
+    def __init__(self, model: str = "gemini-embedding-001"):
+        self.model = model
+        self.name = model
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        client = gemini_client.get_client()
+        result = client.models.embed_content(model=self.model, contents=texts)
+        return [e.values for e in result.embeddings]
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        client = gemini_client.get_client()
+        result = await client.aio.models.embed_content(model=self.model, contents=texts)
+        return [e.values for e in result.embeddings]
+
+
+class HashingEmbedder(Embedder):
+    """
+    Signed feature hashing of character n-grams (min_n..max_n) over the
+    lower-cased, space-padded words of each text, with sublinear term
+    weighting and L2 normalisation. A whole batch is hashed at once: the
+    texts are concatenated into one byte array and each n-gram size is a
+    vectorised FNV-1a over shifted views of it.
+    """
+
+    max_batch = 1024
+
+    def __init__(self, dim: int = 1024, min_n: int = 3, max_n: int = 5):
+        if dim <= 0 or not 1 <= min_n <= max_n:
+            raise ValueError("HashingEmbedder needs dim > 0 and 1 <= min_n <= max_n")
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+        self.name = f"hashing-char{min_n}-{max_n}-d{dim}"
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dim) float32 array of unit rows."""
+        docs = [(" " + " ".join(_WORD_RE.findall(t.lower())) + " ").encode("utf-8") for t in texts]
+        out = np.zeros(len(docs) * self.dim, dtype=np.float32)
+        if not docs:
+            return out.reshape(0, self.dim)
+
+        data = np.frombuffer(b"".join(docs), dtype=np.uint8).astype(np.uint64)
+        owner = np.repeat(np.arange(len(docs)), [len(d) for d in docs])
+        for n in range(self.min_n, self.max_n + 1):
+            count = data.size - n + 1
+            if count <= 0:
+                break
+            h = np.full(count, _FNV_OFFSET, dtype=np.uint64)
+            for j in range(n):
+                h = (h ^ data[j : j + count]) * _FNV_PRIME
+            # Drop n-grams that straddle two texts
+            inside = owner[:count] == owner[n - 1 : n - 1 + count]
+            h = h[inside]
+            cells = owner[:count][inside] * self.dim + ((h >> np.uint64(32)) % np.uint64(self.dim)).astype(np.int64)
+            signs = np.where(h & np.uint64(1), -1.0, 1.0)
+            out += np.bincount(cells, weights=signs, minlength=out.size).astype(np.float32)
+
+        matrix = out.reshape(len(docs), self.dim)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+
+def create_embedder(backend: str = "gemini", **kwargs) -> Embedder:
+    """Build the embedder selected by `backend` ("gemini" or "hashing")."""
+    if backend == "gemini":
+        return GeminiEmbedder(**kwargs)
+    if backend == "hashing":
+        return HashingEmbedder(**kwargs)
+    raise ValueError(f"Unknown embedding backend: {backend!r}")
@@ -0,0 +1,238 @@
+"""
+Embedding Pipeline — concurrent, rate-limit-aware batch embedding for
+ingestion: a token-bucket rate limiter, adaptive (AIMD) batch sizing,
+bounded parallelism and exponential backoff with jitter on quota errors.
+
+Completed batches are handed to an `on_batch` callback as soon as they
+finish, so callers can checkpoint them (knowledge_store upserts each batch
+into Chroma with its content hash) and a later run resumes where an
+interrupted one stopped. arun() does the same on the event loop, for async
+callers such as batch query embedding.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available (clamped to capacity), then take them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take `tokens` (clamped to capacity) if available now; never blocks."""
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` would be available (0 if they are now)."""
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True for rate-limit / transient upstream errors worth retrying."""
+    code = getattr(error, "code", None)
+    if code in (429, 500, 503):
+        return True
+    text = str(error)
+    return "RESOURCE_EXHAUSTED" in text or "UNAVAILABLE" in text
+
+
+class EmbeddingPipeline:
+    """Embeds (id, text) items concurrently, adapting batch size to quota errors."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[list[str]], list[list[float]]],
+        rate_limiter: Optional[TokenBucket] = None,
+        max_workers: int = 4,
+        batch_size: int = 50,
+        min_batch_size: int = 1,
+        max_batch_size: int = 100,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        is_retryable: Callable[[Exception], bool] = is_quota_error,
+        aembed_fn: Optional[Callable[[list[str]], Awaitable[list[list[float]]]]] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.aembed_fn = aembed_fn
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.is_retryable = is_retryable
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _shrink(self, state: dict, pending: deque, batch: list) -> list:
+        """
+        Multiplicative decrease on quota pressure; hand the excess back so the
+        retry uses the smaller batch too. Returns the batch to retry.
+        """
+        state["batch_size"] = max(self.min_batch_size, state["batch_size"] // 2)
+        keep = max(self.min_batch_size, min(len(batch), state["batch_size"]))
+        pending.extendleft(reversed(batch[keep:]))
+        return batch[:keep]
+
+    def run(
+        self,
+        items: list[tuple[str, str]],
+        on_batch: Callable[[list[str], list[str], list[list[float]]], None],
+    ) -> int:
+        """
+        Embed all items. `on_batch(ids, texts, embeddings)` is called once per
+        completed batch (serialised, never concurrently). Returns the number of
+        items embedded; raises the first non-retryable error after in-flight
+        batches finish.
+        """
+        pending = deque(items)
+        lock = threading.Lock()
+        callback_lock = threading.Lock()
+        state = {"batch_size": self.batch_size, "done": 0, "error": None}
+
+        def take_batch() -> list[tuple[str, str]]:
+            with lock:
+                if state["error"] is not None:
+                    return []
+                size = state["batch_size"]
+                return [pending.popleft() for _ in range(min(size, len(pending)))]
+
+        def worker() -> None:
+            while True:
+                batch = take_batch()
+                if not batch:
+                    return
+                ids = [doc_id for doc_id, _ in batch]
+                texts = [text for _, text in batch]
+                attempt = 0
+                while True:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.acquire(len(texts))
+                    try:
+                        embeddings = self.embed_fn(texts)
+                        break
+                    except Exception as e:
+                        if not self.is_retryable(e) or attempt >= self.max_retries:
+                            with lock:
+                                state["error"] = state["error"] or e
+                            return
+                        with lock:
+                            batch = self._shrink(state, pending, batch)
+                        ids = [doc_id for doc_id, _ in batch]
+                        texts = [text for _, text in batch]
+                        delay = self._backoff(attempt)
+                        print(f"⏳ Embedding quota error ({e}); retrying {len(texts)} texts in {delay:.1f}s...")
+                        time.sleep(delay)
+                        attempt += 1
+
+                with callback_lock:
+                    on_batch(ids, texts, embeddings)
+                with lock:
+                    state["done"] += len(batch)
+                    # Additive increase while requests succeed
+                    state["batch_size"] = min(self.max_batch_size, state["batch_size"] + 5)
+
+        workers = max(1, min(self.max_workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            for future in [pool.submit(worker) for _ in range(workers)]:
+                future.result()
+
+        if state["error"] is not None:
+            raise state["error"]
+        return state["done"]
+
+    async def arun(
+        self,
+        items: list[tuple[str, str]],
+        on_batch: Callable[[list[str], list[str], list[list[float]]], None],
+    ) -> int:
+        """
+        run() on the event loop: batches go to `aembed_fn`, at most max_workers
+        at a time, with the same rate limiting, backoff and batch sizing.
+        """
+        if self.aembed_fn is None:
+            raise ValueError("arun() needs an aembed_fn")
+        pending = deque(items)
+        state = {"batch_size": self.batch_size, "done": 0, "error": None}
+
+        def take_batch() -> list[tuple[str, str]]:
+            if state["error"] is not None:
+                return []
+            return [pending.popleft() for _ in range(min(state["batch_size"], len(pending)))]
+
+        async def worker() -> None:
+            while True:
+                batch = take_batch()
+                if not batch:
+                    return
+                texts = [text for _, text in batch]
+                attempt = 0
+                while True:
+                    if self.rate_limiter is not None:
+                        while not self.rate_limiter.try_acquire(len(texts)):
+                            await asyncio.sleep(self.rate_limiter.wait_time(len(texts)))
+                    try:
+                        embeddings = await self.aembed_fn(texts)
+                        break
+                    except Exception as e:
+                        if not self.is_retryable(e) or attempt >= self.max_retries:
+                            state["error"] = state["error"] or e
+                            return
+                        batch = self._shrink(state, pending, batch)
+                        texts = [text for _, text in batch]
+                        delay = self._backoff(attempt)
+                        print(f"⏳ Embedding quota error ({e}); retrying {len(texts)} texts in {delay:.1f}s...")
+                        await asyncio.sleep(delay)
+                        attempt += 1
+
+                on_batch([doc_id for doc_id, _ in batch], texts, embeddings)
+                state["done"] += len(batch)
+                state["batch_size"] = min(self.max_batch_size, state["batch_size"] + 5)
+
+        workers = max(1, min(self.max_workers, len(items)))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+        if state["error"] is not None:
+            raise state["error"]
+        return state["done"]
@@ -0,0 +1,61 @@
+"""
+Gemini Client — a single shared google-genai client for embeddings and
+generation, backed by explicitly sized, keep-alive HTTP connection pools.
+"""
+
+import importlib.util
+import os
+from typing import Optional
+
+import httpx
+from google import genai
+
+
+GEMINI_TIMEOUT_MS = int(os.getenv("GEMINI_TIMEOUT_MS", "60000"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "100"))
+GEMINI_MAX_KEEPALIVE = int(os.getenv("GEMINI_MAX_KEEPALIVE", "20"))
+GEMINI_KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+GEMINI_HTTP2 = os.getenv("GEMINI_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+# Module-level state
+_client: Optional[genai.Client] = None
+
+
+def _http_options() -> genai.types.HttpOptions:
+    pool_args = {
+        "limits": httpx.Limits(
+            max_connections=GEMINI_MAX_CONNECTIONS,
+            max_keepalive_connections=GEMINI_MAX_KEEPALIVE,
+            keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+        ),
+        "http2": GEMINI_HTTP2,
+    }
+    return genai.types.HttpOptions(
+        timeout=GEMINI_TIMEOUT_MS,
+        client_args=dict(pool_args),
+        async_client_args=dict(pool_args),
+    )
+
+
+def get_client() -> genai.Client:
+    """Return the shared Gemini client, creating it on first use."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY not set in environment")
+        _client = genai.Client(api_key=api_key, http_options=_http_options())
+    return _client
+
+
+async def aclose() -> None:
+    """Close both the sync and async connection pools of the shared client."""
+    global _client
+    if _client is None:
+        return
+    client, _client = _client, None
+    try:
+        await client.aio.aclose()
+    finally:
+        client.close()
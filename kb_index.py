@@ -0,0 +1,124 @@
+"""
+Navigation Index — precomputed lookups over the KNOWLEDGE_BASE for the
+browse flow (services → categories → questions → answer), plus the id-keyed
+entry store shared by the browse handlers and the RAG pipeline.
+
+The index is built once from the knowledge base and never mutated; when the
+knowledge base changes, call rebuild() to swap in a fresh index atomically.
+"""
+
+import sys
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+class KBEntry:
+    """Compact, read-only record for a single knowledge base entry."""
+
+    __slots__ = ("id", "service", "category", "question", "answer", "keywords")
+
+    def __init__(self, item: dict):
+        set_ = object.__setattr__
+        set_(self, "id", sys.intern(item["id"]))
+        set_(self, "service", sys.intern(item["service"]))
+        set_(self, "category", sys.intern(item["category"]))
+        set_(self, "question", item["question"])
+        set_(self, "answer", item["answer"])
+        set_(self, "keywords", tuple(item.get("keywords", ())))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KBEntry is immutable")
+
+    def __repr__(self) -> str:
+        return f"KBEntry(id={self.id!r})"
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "service": self.service,
+            "category": self.category,
+            "question": self.question,
+            "answer": self.answer,
+            "keywords": list(self.keywords),
+        }
+
+
+class NavigationIndex:
+    """Immutable, read-only view of the knowledge base keyed for O(1) browsing."""
+
+    __slots__ = (
+        "services",
+        "service_set",
+        "categories",
+        "category_sets",
+        "questions",
+        "overviews",
+        "question_counts",
+        "entries",
+    )
+
+    def __init__(self, knowledge_base: list[dict]):
+        categories: dict[str, set[str]] = {}
+        questions: dict[tuple[str, str], list[dict]] = {}
+        overviews: dict[str, str] = {}
+        question_counts: dict[str, int] = {}
+        entries: dict[str, KBEntry] = {}
+
+        for item in knowledge_base:
+            if item["id"] in entries:
+                continue
+            entry = KBEntry(item)
+            entries[entry.id] = entry
+            service = entry.service
+            category = entry.category
+            cats = categories.setdefault(service, set())
+            if category != "Overview":
+                cats.add(category)
+            questions.setdefault((service, category), []).append(
+                {"id": entry.id, "question": entry.question}
+            )
+            # Overview answer is the first entry whose id ends with '000'
+            if entry.id.endswith("000") and service not in overviews:
+                overviews[service] = entry.answer
+            question_counts[service] = question_counts.get(service, 0) + 1
+
+        self.services: tuple[str, ...] = tuple(sorted(categories))
+        self.service_set: frozenset[str] = frozenset(self.services)
+        self.categories: Mapping[str, tuple[str, ...]] = MappingProxyType(
+            {svc: tuple(sorted(cats)) for svc, cats in categories.items()}
+        )
+        self.category_sets: Mapping[str, frozenset[str]] = MappingProxyType(
+            {svc: frozenset(cats) for svc, cats in categories.items()}
+        )
+        self.questions: Mapping[tuple[str, str], tuple[dict, ...]] = MappingProxyType(
+            {key: tuple(qs) for key, qs in questions.items()}
+        )
+        self.overviews: Mapping[str, str] = MappingProxyType(overviews)
+        self.question_counts: Mapping[str, int] = MappingProxyType(question_counts)
+        self.entries: Mapping[str, KBEntry] = MappingProxyType(entries)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("NavigationIndex is immutable; use rebuild() instead")
+        object.__setattr__(self, name, value)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+# Module-level state
+_index: Optional[NavigationIndex] = None
+
+
+def rebuild(knowledge_base: list[dict]) -> NavigationIndex:
+    """Build a fresh index from the knowledge base and make it current."""
+    global _index
+    _index = NavigationIndex(knowledge_base)
+    return _index
+
+
+def get_index() -> NavigationIndex:
+    """Return the current index. Call rebuild() at least once first."""
+    if _index is None:
+        raise RuntimeError("Navigation index not built. Call rebuild() first.")
+    return _index
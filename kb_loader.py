@@ -0,0 +1,134 @@
+"""
+Knowledge Base Loader — reads the KNOWLEDGE_BASE from its versioned data
+file (data/knowledge_base.json), preferring the compiled snapshot written by
+build_kb.py when it is up to date.
+
+The snapshot is decoded with marshal, which skips parsing and validating
+the JSON on every worker start. Each worker still builds its own copy of the
+entries; the snapshot saves start-up time, not memory.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import struct
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+KB_JSON_PATH = os.path.join(DATA_DIR, "knowledge_base.json")
+SCHEMA_VERSION = 1
+
+SNAPSHOT_MAGIC = b"ESKB"
+SNAPSHOT_FORMAT = 1
+# magic, format version, sha256 of the source JSON
+_HEADER = struct.Struct("<4sI32s")
+
+REQUIRED_FIELDS = ("id", "service", "category", "question", "answer")
+
+
+class KnowledgeBaseError(ValueError):
+    """The knowledge base data file is malformed."""
+
+
+def snapshot_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".snapshot"
+
+
+def validate(payload: dict) -> list[dict]:
+    """Check the data file's schema and return its entries; raises KnowledgeBaseError."""
+    if not isinstance(payload, dict) or payload.get("schema_version") != SCHEMA_VERSION:
+        raise KnowledgeBaseError(f"expected an object with schema_version {SCHEMA_VERSION}")
+    entries = payload.get("entries")
+    if not isinstance(entries, list) or not entries:
+        raise KnowledgeBaseError("'entries' must be a non-empty list")
+
+    errors = []
+    seen_ids = set()
+    for i, item in enumerate(entries):
+        where = f"entries[{i}]"
+        if not isinstance(item, dict):
+            errors.append(f"{where}: not an object")
+            continue
+        for field in REQUIRED_FIELDS:
+            value = item.get(field)
+            if not isinstance(value, str) or not value.strip():
+                errors.append(f"{where}: '{field}' must be a non-empty string")
+        keywords = item.get("keywords", [])
+        if not isinstance(keywords, list) or not all(isinstance(k, str) for k in keywords):
+            errors.append(f"{where}: 'keywords' must be a list of strings")
+        unknown = set(item) - set(REQUIRED_FIELDS) - {"keywords"}
+        if unknown:
+            errors.append(f"{where}: unknown fields {sorted(unknown)}")
+        if item.get("id") in seen_ids:
+            errors.append(f"{where}: duplicate id {item.get('id')!r}")
+        seen_ids.add(item.get("id"))
+
+    if errors:
+        raise KnowledgeBaseError("invalid knowledge base:\n  " + "\n  ".join(errors))
+    return entries
+
+
+def _read_source(json_path: str) -> tuple[bytes, bytes]:
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    return raw, hashlib.sha256(raw).digest()
+
+
+def compile_snapshot(json_path: str = KB_JSON_PATH) -> tuple[str, int]:
+    """Validate the JSON data file and write its snapshot. Returns (path, entry count)."""
+    raw, digest = _read_source(json_path)
+    entries = validate(json.loads(raw))
+    records = tuple(
+        (e["id"], e["service"], e["category"], e["question"], e["answer"], tuple(e.get("keywords", ())))
+        for e in entries
+    )
+    out_path = snapshot_path(json_path)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, digest))
+        f.write(marshal.dumps(records))
+    os.replace(tmp_path, out_path)
+    return out_path, len(records)
+
+
+def _load_snapshot(path: str, source_digest: bytes):
+    """Return the snapshot's records, or None if it is missing, foreign, stale or unreadable."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        return None
+    magic, fmt, digest = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT or digest != source_digest:
+        return None
+    try:
+        return marshal.loads(memoryview(data)[_HEADER.size:])
+    except (ValueError, EOFError, TypeError) as e:
+        # Truncated, corrupt or written by another Python version
+        print(f"⚠️ Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def load_knowledge_base(json_path: str = KB_JSON_PATH) -> list[dict]:
+    """
+    Load the knowledge base. Uses the compiled snapshot when it matches the
+    JSON source; otherwise parses and validates the JSON directly.
+    """
+    raw, digest = _read_source(json_path)
+    records = _load_snapshot(snapshot_path(json_path), digest)
+    if records is not None:
+        return [
+            {
+                "id": id_,
+                "service": service,
+                "category": category,
+                "question": question,
+                "answer": answer,
+                "keywords": list(keywords),
+            }
+            for id_, service, category, question, answer, keywords in records
+        ]
+
+    print(f"ℹ️ No up-to-date snapshot for {json_path}; parsing JSON (run build_kb.py to compile one).")
+    return validate(json.loads(raw))
@@ -1,141 +1,654 @@
 """
-ChromaDB Knowledge Store — embeds the KNOWLEDGE_BASE using Gemini embeddings
-and provides semantic search for the AI chat pipeline.
+ChromaDB Knowledge Store — embeds the KNOWLEDGE_BASE (with Gemini embeddings
+by default, or a local embedder; see embedders.py) and provides semantic
+search for the AI chat pipeline.
 """
 
+import asyncio
 import chromadb
-from google import genai
+import contextvars
+import functools
+import hashlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from caches import TTLCache
+import embedders
+import kb_index
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from metrics import track_stage
+import tracing
+from vector_index import MemoryVectorIndex
 import os
 import time
-from typing import Optional
+from embedding_pipeline import EmbeddingPipeline, TokenBucket
+from typing import Callable, Optional
 
 
 CHROMA_DIR = os.path.join(os.path.dirname(__file__), "chroma_db")
 COLLECTION_NAME = "eseba_knowledge"
 EMBED_MODEL = "gemini-embedding-001"
 
+# Embedding backend: "gemini" or "hashing" (local character n-gram features;
+# no API key or network). Each backend stores its vectors in its own
+# collection. EMBED_FALLBACK=hashing keeps a local index alongside the Gemini
+# one, used while Gemini ingestion is still running or query embedding fails.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "gemini")
+EMBED_FALLBACK = os.getenv("EMBED_FALLBACK", "")
+HASH_EMBED_DIM = int(os.getenv("HASH_EMBED_DIM", "1024"))
+
+# Ingestion embedding pipeline (see embedding_pipeline.py)
+EMBED_RATE_PER_MINUTE = float(os.getenv("EMBED_RATE_PER_MINUTE", "1500"))  # texts/minute
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "50"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+
+# Query-embedding cache of float32 vectors (2048 × 3072 dims ≈ 24 MiB); set
+# EMBED_CACHE_PATH to persist it across restarts (binary .npz)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL = float(os.getenv("EMBED_CACHE_TTL", str(7 * 24 * 3600)))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")
+
+# Query backend: "memory" (in-process NumPy index, embeddings persisted in
+# Chroma) or "chroma" (HNSW query through Chroma, for large corpora)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "memory")
+
+# Retrieval mode: "hybrid" (vector + BM25 fused with reciprocal rank fusion)
+# or "vector". In hybrid mode the vector leg fetches VECTOR_CANDIDATES hits, or
+# n_results if a caller asks for more.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+VECTOR_CANDIDATES = int(os.getenv("VECTOR_CANDIDATES", "5"))
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Chroma queries are blocking; async callers run them on this bounded pool
+CHROMA_QUERY_WORKERS = int(os.getenv("CHROMA_QUERY_WORKERS", "8"))
+
 # Module-level state
 _client: Optional[chromadb.PersistentClient] = None
 _collection: Optional[chromadb.Collection] = None
-_genai_client: Optional[genai.Client] = None
-
-
-def _get_genai_client() -> genai.Client:
-    """Lazy-init the Gemini client."""
-    global _genai_client
-    if _genai_client is None:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise RuntimeError("GEMINI_API_KEY not set in environment")
-        _genai_client = genai.Client(api_key=api_key)
-    return _genai_client
-
-
-def _embed_texts(texts: list[str]) -> list[list[float]]:
-    """Embed a batch of texts using Gemini embedding model."""
-    client = _get_genai_client()
-    all_embeddings = []
-    # Process in batches of 20 to avoid rate limits
-    batch_size = 20
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
-        result = client.models.embed_content(
-            model=EMBED_MODEL,
-            contents=batch,
+_memory_index: Optional[MemoryVectorIndex] = None
+_lexical_index: Optional[tuple[kb_index.NavigationIndex, BM25Index]] = None
+_status: dict = {"state": "cold", "error": None, "started_at": None, "ready_at": None}
+_embed_cache = TTLCache(max_size=EMBED_CACHE_SIZE, ttl=EMBED_CACHE_TTL)
+_reingest_listeners: list[Callable[[], None]] = []
+
+
+def _create_embedder(backend: str) -> embedders.Embedder:
+    if backend == "gemini":
+        return embedders.create_embedder(backend, model=EMBED_MODEL)
+    if backend == "hashing":
+        return embedders.create_embedder(backend, dim=HASH_EMBED_DIM)
+    return embedders.create_embedder(backend)
+
+
+_embedder = _create_embedder(EMBED_BACKEND)
+_fallback_embedder: Optional[embedders.Embedder] = (
+    _create_embedder(EMBED_FALLBACK) if EMBED_FALLBACK and EMBED_FALLBACK != EMBED_BACKEND else None
+)
+_fallback_index: Optional[MemoryVectorIndex] = None
+_embed_rate_limiter = TokenBucket(rate=EMBED_RATE_PER_MINUTE / 60, capacity=_embedder.max_batch)
+_chroma_executor = ThreadPoolExecutor(max_workers=CHROMA_QUERY_WORKERS, thread_name_prefix="chroma-query")
+
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    """Embed up to _embedder.max_batch texts in a single call."""
+    return _embedder.embed(texts)
+
+
+def _pipeline() -> EmbeddingPipeline:
+    if not _embedder.remote:
+        # Local embedders need no rate limiting, retries or parallelism
+        return EmbeddingPipeline(
+            _embed_batch,
+            max_workers=1,
+            batch_size=_embedder.max_batch,
+            max_batch_size=_embedder.max_batch,
+            aembed_fn=_embedder.aembed,
         )
-        all_embeddings.extend([e.values for e in result.embeddings])
-        if i + batch_size < len(texts):
-            time.sleep(0.5)  # Brief pause between batches
-    return all_embeddings
+    return EmbeddingPipeline(
+        _embed_batch,
+        aembed_fn=_embedder.aembed,
+        rate_limiter=_embed_rate_limiter,
+        max_workers=EMBED_CONCURRENCY,
+        batch_size=min(EMBED_BATCH_SIZE, _embedder.max_batch),
+        max_batch_size=_embedder.max_batch,
+        max_retries=EMBED_MAX_RETRIES,
+    )
+
+
+def _embed_texts(
+    texts: list[str], on_batch: Optional[Callable[[list[str], list], None]] = None
+) -> list[list[float]]:
+    """
+    Embed texts with the configured embedder; large inputs go through the
+    pipeline (rate limited and retried, sharing quota with ingestion).
+    `on_batch(texts, embeddings)` is called as each batch completes.
+    """
+    if len(texts) <= _embedder.max_batch:
+        embeddings = _embed_batch(texts)
+        if on_batch is not None:
+            on_batch(texts, embeddings)
+        return embeddings
+
+    embeddings: list = [None] * len(texts)
+
+    def collect(ids, batch_texts, batch_embeddings):
+        for i, embedding in zip(ids, batch_embeddings):
+            embeddings[i] = embedding
+        if on_batch is not None:
+            on_batch(batch_texts, batch_embeddings)
+
+    _pipeline().run(list(enumerate(texts)), collect)
+    return embeddings
+
+
+async def _aembed_texts(
+    texts: list[str], on_batch: Optional[Callable[[list[str], list], None]] = None
+) -> list[list[float]]:
+    """Async variant of _embed_texts()."""
+    if len(texts) <= _embedder.max_batch:
+        embeddings = await _embedder.aembed(texts)
+        if on_batch is not None:
+            on_batch(texts, embeddings)
+        return embeddings
+
+    embeddings: list = [None] * len(texts)
+
+    def collect(ids, batch_texts, batch_embeddings):
+        for i, embedding in zip(ids, batch_embeddings):
+            embeddings[i] = embedding
+        if on_batch is not None:
+            on_batch(batch_texts, batch_embeddings)
+
+    await _pipeline().arun(list(enumerate(texts)), collect)
+    return embeddings
+
+
+def _cache_key(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _cache_embedding(key: str, embedding) -> np.ndarray:
+    """Store an embedding as a float32 vector (a quarter the size of a list of floats)."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    _embed_cache.set(key, vector)
+    return vector
+
+
+def embed_query(text: str) -> np.ndarray:
+    """Embed a single (already normalised) query, using the embedding cache."""
+    key = _cache_key(text)
+    embedding = _embed_cache.get(key)
+    if embedding is None:
+        with track_stage("embed"):
+            embedding = _cache_embedding(key, _embed_batch([key])[0])
+    return embedding
+
+
+async def aembed_query(text: str) -> np.ndarray:
+    """Async variant of embed_query()."""
+    key = _cache_key(text)
+    embedding = _embed_cache.get(key)
+    if embedding is None:
+        with track_stage("embed"):
+            embedding = _cache_embedding(key, (await _aembed_texts([key]))[0])
+    return embedding
+
+
+def _cache_batch(found: dict[str, np.ndarray], keys: list[str], embeddings: list) -> None:
+    for key, embedding in zip(keys, embeddings):
+        found[key] = _cache_embedding(key, embedding)
+
+
+def _split_cached(texts: list[str]) -> tuple[list[str], dict[str, np.ndarray], list[str]]:
+    """Return (cache keys, cached embeddings by key, distinct uncached keys)."""
+    keys = [_cache_key(t) for t in texts]
+    found = {}
+    for key in dict.fromkeys(keys):
+        embedding = _embed_cache.get(key)
+        if embedding is not None:
+            found[key] = embedding
+    missing = [key for key in dict.fromkeys(keys) if key not in found]
+    return keys, found, missing
+
+
+def embed_queries(texts: list[str]) -> list[np.ndarray]:
+    """
+    Embed many queries; only distinct cache misses go to Gemini, in batched
+    calls. Each batch is cached as it completes, so a failure part-way keeps
+    the batches already embedded.
+    """
+    keys, found, missing = _split_cached(texts)
+    if missing:
+        with track_stage("embed"):
+            _embed_texts(missing, functools.partial(_cache_batch, found))
+    return [found[key] for key in keys]
+
+
+async def aembed_queries(texts: list[str]) -> list[np.ndarray]:
+    """Async variant of embed_queries()."""
+    keys, found, missing = _split_cached(texts)
+    if missing:
+        with track_stage("embed"):
+            await _aembed_texts(missing, functools.partial(_cache_batch, found))
+    return [found[key] for key in keys]
+
+
+def embed_cache_stats() -> dict:
+    return _embed_cache.stats()
+
+
+def shutdown() -> None:
+    """Persist caches and release the Chroma query pool."""
+    save_caches()
+    _chroma_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def save_caches() -> None:
+    """Persist the query-embedding cache if EMBED_CACHE_PATH is configured."""
+    if not EMBED_CACHE_PATH:
+        return
+    try:
+        _embed_cache.save_vectors(EMBED_CACHE_PATH, tag=_embedder.name)
+        print(f"💾 Saved {len(_embed_cache)} cached query embeddings to {EMBED_CACHE_PATH}.")
+    except OSError as e:
+        print(f"⚠️ Could not save embedding cache: {e}")
+
+
+def on_reingest(callback: Callable[[], None]) -> None:
+    """Register a callback to run whenever the collection is (re-)embedded."""
+    _reingest_listeners.append(callback)
+
+
+def _notify_reingest() -> None:
+    for callback in _reingest_listeners:
+        callback()
 
 
 def initialize(knowledge_base: list[dict]) -> None:
     """
     Initialize the ChromaDB collection from the KNOWLEDGE_BASE.
-    Skips re-ingestion if the collection already has the right count.
+    Only new or changed entries are embedded; see _ingest().
+    With VECTOR_BACKEND=memory, also loads the embeddings into the
+    in-process vector index used for queries.
     """
-    global _client, _collection
+    global _client
 
-    _client = chromadb.PersistentClient(path=CHROMA_DIR)
-
-    # Check if collection already populated
+    _status.update(state="loading", error=None, started_at=time.time())
     try:
-        _collection = _client.get_collection(name=COLLECTION_NAME)
-        if _collection.count() == len(knowledge_base):
-            print(f"✅ ChromaDB collection '{COLLECTION_NAME}' already has {_collection.count()} docs. Skipping ingestion.")
-            return
-        else:
-            print(f"🔄 Collection count mismatch ({_collection.count()} vs {len(knowledge_base)}). Re-creating...")
-            _client.delete_collection(name=COLLECTION_NAME)
-    except Exception:
-        pass  # Collection doesn't exist yet
-
-    print(f"📦 Creating ChromaDB collection and embedding {len(knowledge_base)} entries...")
-    _collection = _client.create_collection(
-        name=COLLECTION_NAME,
+        if _fallback_embedder is not None:
+            _build_fallback_index(knowledge_base)
+        if EMBED_CACHE_PATH:
+            loaded = _embed_cache.load_vectors(EMBED_CACHE_PATH, tag=_embedder.name)
+            if loaded:
+                print(f"♻️ Loaded {loaded} cached query embeddings from {EMBED_CACHE_PATH}.")
+
+        _client = chromadb.PersistentClient(path=CHROMA_DIR)
+        _ingest(knowledge_base)
+
+        if VECTOR_BACKEND == "memory":
+            _load_memory_index()
+    except Exception as e:
+        _status.update(state="failed", error=str(e))
+        raise
+    _status.update(state="ready", ready_at=time.time())
+
+
+def is_ready() -> bool:
+    """True once initialize() has completed and vector search can be used."""
+    return _status["state"] == "ready"
+
+
+def status() -> dict:
+    """Index state for readiness probes: cold, loading, ready or failed."""
+    documents = None
+    if _memory_index is not None:
+        documents = len(_memory_index)
+    elif _collection is not None and is_ready():
+        documents = _collection.count()
+    return {**_status, "backend": VECTOR_BACKEND, "documents": documents}
+
+
+def _build_fallback_index(knowledge_base: list[dict]) -> None:
+    """Embed the knowledge base locally with the fallback embedder (milliseconds, no network)."""
+    global _fallback_index
+    docs = {}
+    for item in knowledge_base:
+        docs.setdefault(item["id"], _document_text(item))
+    embeddings = []
+    texts = list(docs.values())
+    for i in range(0, len(texts), _fallback_embedder.max_batch):
+        embeddings.extend(_fallback_embedder.embed(texts[i : i + _fallback_embedder.max_batch]))
+    _fallback_index = MemoryVectorIndex(list(docs), embeddings)
+    print(f"🧯 Built {_fallback_embedder.name} fallback index over {len(_fallback_index)} entries.")
+
+
+def _fallback_search(text: str, n_results: int) -> Optional[list[tuple[str, float]]]:
+    """Vector hits from the fallback index, or None if there is none."""
+    if _fallback_index is None:
+        return None
+    with track_stage("fallback_query"):
+        return _fallback_index.search(_fallback_embedder.embed([text])[0], n_results)
+
+
+def _collection_name() -> str:
+    """Each embedder gets its own collection; Gemini keeps the original name."""
+    if isinstance(_embedder, embedders.GeminiEmbedder) and _embedder.model == EMBED_MODEL:
+        return COLLECTION_NAME
+    return f"{COLLECTION_NAME}_{_embedder.name}"
+
+
+def _load_memory_index() -> None:
+    """Load all stored embeddings from Chroma into the in-process vector index."""
+    global _memory_index
+    data = _collection.get(include=["embeddings"])
+    _memory_index = MemoryVectorIndex(data["ids"], data["embeddings"])
+    print(f"🧮 Loaded {len(_memory_index)} embeddings into the in-memory vector index.")
+
+
+def _document_text(item: dict) -> str:
+    return f"Service: {item['service']}. Category: {item['category']}. Question: {item['question']}. Answer: {item['answer']}"
+
+
+def _content_hash(doc_text: str) -> str:
+    """Hash of what gets embedded; includes the embedder so a model change re-embeds."""
+    return hashlib.sha256(f"{_embedder.name}\n{doc_text}".encode("utf-8")).hexdigest()
+
+
+def _ingest(knowledge_base: list[dict]) -> None:
+    """
+    Sync the Chroma collection with the knowledge base. Each entry's content
+    hash is stored in its metadata, so only new or edited entries are
+    (re-)embedded and entries no longer in the knowledge base are deleted.
+    """
+    global _collection
+
+    _collection = _client.get_or_create_collection(
+        name=_collection_name(),
         metadata={"hnsw:space": "cosine"},
     )
 
-    # Prepare documents for embedding
-    ids = []
-    documents = []
-    metadatas = []
+    # Content hashes of what is already stored
+    existing = _collection.get(include=["metadatas"])
+    stored_hashes = {
+        doc_id: (meta or {}).get("content_hash")
+        for doc_id, meta in zip(existing["ids"], existing["metadatas"])
+    }
 
+    # Documents the knowledge base wants stored (first entry wins on duplicate ids)
+    wanted: dict[str, tuple[str, dict]] = {}
     for item in knowledge_base:
-        doc_text = f"Service: {item['service']}. Category: {item['category']}. Question: {item['question']}. Answer: {item['answer']}"
-        ids.append(item["id"])
-        documents.append(doc_text)
-        metadatas.append({
+        if item["id"] in wanted:
+            continue
+        doc_text = _document_text(item)
+        # Answer text lives in kb_index; keep the Chroma payload small.
+        wanted[item["id"]] = (doc_text, {
             "service": item["service"],
             "category": item["category"],
-            "question": item["question"],
-            "answer": item["answer"],
+            "content_hash": _content_hash(doc_text),
         })
 
-    # Embed all documents
-    embeddings = _embed_texts(documents)
+    removed = [doc_id for doc_id in stored_hashes if doc_id not in wanted]
+    changed = [
+        doc_id for doc_id, (_, meta) in wanted.items()
+        if stored_hashes.get(doc_id) != meta["content_hash"]
+    ]
 
-    # Upsert into ChromaDB
-    _collection.add(
-        ids=ids,
-        embeddings=embeddings,
-        documents=documents,
-        metadatas=metadatas,
-    )
-    print(f"✅ Successfully embedded and stored {len(ids)} knowledge base entries in ChromaDB.")
+    if not removed and not changed:
+        print(f"✅ ChromaDB collection '{_collection_name()}' is up to date ({len(wanted)} docs). Skipping ingestion.")
+        return
 
+    if removed:
+        _collection.delete(ids=removed)
+        print(f"🗑️ Removed {len(removed)} entries no longer in the knowledge base.")
 
-def query(text: str, n_results: int = 5) -> list[dict]:
+    try:
+        if changed:
+            print(f"📦 Embedding {len(changed)} new or changed entries (of {len(wanted)})...")
+
+            # Upsert each batch as soon as it is embedded: the stored content
+            # hashes act as a checkpoint, so an interrupted run resumes here.
+            def store_batch(ids, documents, embeddings):
+                _collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=[wanted[doc_id][1] for doc_id in ids],
+                )
+
+            stored = _pipeline().run([(doc_id, wanted[doc_id][0]) for doc_id in changed], store_batch)
+            print(f"✅ Successfully embedded and stored {stored} knowledge base entries in ChromaDB.")
+    finally:
+        # Even a partial run changed what is stored; drop dependent caches
+        _notify_reingest()
+
+
+def _vector_search_many(query_embeddings: list[list[float]], n_results: int) -> list[list[tuple[str, float]]]:
+    """Nearest-neighbour search for several embeddings on the configured backend."""
+    if not is_ready():
+        raise RuntimeError("Knowledge store not ready. Call initialize() first.")
+    with track_stage("vector_query"):
+        if _memory_index is not None:
+            return _memory_index.search_many(query_embeddings, n_results)
+        results = _collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            include=["distances"],
+        )
+
+    all_hits = []
+    for row_ids, row_distances in zip(results["ids"] or [], results["distances"] or []):
+        hits = []
+        for doc_id, distance in zip(row_ids, row_distances):
+            # ChromaDB cosine distance: 0 = identical, 2 = opposite
+            similarity = 1 - (distance / 2)
+            hits.append((doc_id, round(similarity, 4)))
+        all_hits.append(hits)
+
+    return all_hits
+
+
+def _vector_search(query_embedding: list[float], n_results: int) -> list[tuple[str, float]]:
+    """Nearest-neighbour search for one embedding on the configured backend."""
+    results = _vector_search_many([query_embedding], n_results)
+    return results[0] if results else []
+
+
+def query_ids_for_embedding(query_embedding: list[float], n_results: int = 5) -> list[tuple[str, float]]:
+    """Vector search for an already-embedded query; returns (id, score) tuples."""
+    if not is_ready():
+        raise RuntimeError("Knowledge store not ready. Call initialize() first.")
+    return _vector_search(query_embedding, n_results)
+
+
+def query_ids(text: str, n_results: int = 5) -> list[tuple[str, float]]:
+    """
+    Vector-only search for entries most similar to the query text.
+    Returns a list of (id, score) tuples, best match first.
+    """
+    # Embed the query (cached on the normalised text)
+    return query_ids_for_embedding(embed_query(text), n_results)
+
+
+async def aquery_ids(text: str, n_results: int = 5) -> list[tuple[str, float]]:
+    """Async variant of query_ids(); Chroma queries run on the bounded query pool."""
+    query_embedding = await aembed_query(text)
+    return await _off_loop(query_ids_for_embedding, query_embedding, n_results)
+
+
+def resolve(hits: list[tuple[str, float]]) -> list[dict]:
     """
-    Search the knowledge base for entries most similar to the query text.
+    Resolve (id, score) hits against the in-memory entry store.
     Returns a list of dicts with keys: id, service, category, question, answer, score.
+    Ids that are no longer in the knowledge base are dropped.
     """
+    entries = kb_index.get_index().entries
+    matches = []
+    for doc_id, score in hits:
+        entry = entries.get(doc_id)
+        if entry is None:
+            continue
+        matches.append({
+            "id": entry.id,
+            "service": entry.service,
+            "category": entry.category,
+            "question": entry.question,
+            "answer": entry.answer,
+            "score": score,
+        })
+    return matches
+
+
+def _get_lexical_index() -> BM25Index:
+    """BM25 index over the current kb_index entries, rebuilt when that index changes."""
+    global _lexical_index
+    nav = kb_index.get_index()
+    if _lexical_index is None or _lexical_index[0] is not nav:
+        _lexical_index = (nav, BM25Index(nav.entries.values()))
+    return _lexical_index[1]
+
+
+def _vector_scores(query_embedding: list[float], ids: list[str]) -> dict[str, float]:
+    """Vector similarity of specific ids (e.g. lexical-only hits) to the query."""
+    if _memory_index is not None:
+        return _memory_index.scores_for(query_embedding, ids)
     if _collection is None:
-        raise RuntimeError("Knowledge store not initialized. Call initialize() first.")
+        return {}
+    stored = _collection.get(ids=ids, include=["embeddings"])
+    return MemoryVectorIndex(stored["ids"], stored["embeddings"]).scores_for(query_embedding, stored["ids"])
 
-    # Embed the query
-    query_embedding = _embed_texts([text])[0]
 
-    results = _collection.query(
-        query_embeddings=[query_embedding],
-        n_results=n_results,
-        include=["metadatas", "distances"],
-    )
+def _vector_candidates(n_results: int) -> int:
+    """Vector hits to fetch: at least n_results, so the fused list can always reach it."""
+    return max(VECTOR_CANDIDATES, n_results) if RETRIEVAL_MODE == "hybrid" else n_results
 
-    matches = []
-    if results and results["ids"] and results["ids"][0]:
-        for i, doc_id in enumerate(results["ids"][0]):
-            meta = results["metadatas"][0][i]
-            distance = results["distances"][0][i]
-            # ChromaDB cosine distance: 0 = identical, 2 = opposite
-            similarity = 1 - (distance / 2)
-            matches.append({
-                "id": doc_id,
-                "service": meta.get("service", ""),
-                "category": meta.get("category", ""),
-                "question": meta.get("question", ""),
-                "answer": meta.get("answer", ""),
-                "score": round(similarity, 4),
-            })
 
+def _fuse(
+    text: str,
+    vector_hits: Optional[list[tuple[str, float]]],
+    query_embedding: Optional[list[float]],
+    n_results: int,
+) -> list[dict]:
+    """
+    Combine the vector and BM25 legs with reciprocal rank fusion. `score`
+    stays the vector similarity (filled in for lexical-only hits when the
+    query embedding is known, else None); `lexical` is the BM25 score.
+    Without vector hits (index not ready) this is the lexical ranking alone,
+    whatever the RETRIEVAL_MODE.
+    """
+    if RETRIEVAL_MODE != "hybrid" and vector_hits is not None:
+        return resolve(vector_hits[:n_results])
+
+    with track_stage("lexical_query"):
+        lexical_hits = _get_lexical_index().search(text, LEXICAL_CANDIDATES)
+    fused = reciprocal_rank_fusion(
+        [[doc_id for doc_id, _ in vector_hits or []], [doc_id for doc_id, _ in lexical_hits]],
+        k=RRF_K,
+    )[:n_results]
+
+    scores = dict(vector_hits or [])
+    missing = [doc_id for doc_id in fused if doc_id not in scores]
+    if missing and query_embedding is not None:
+        scores.update(_vector_scores(query_embedding, missing))
+
+    lexical = dict(lexical_hits)
+    matches = resolve([(doc_id, scores.get(doc_id)) for doc_id in fused])
+    for m in matches:
+        m["lexical"] = lexical.get(m["id"], 0.0)
     return matches
+
+
+async def _off_loop(fn, *args):
+    """Run fn inline for the memory backend, or on the Chroma query pool."""
+    if _memory_index is not None:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    # Carry the request trace into the pool thread
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await loop.run_in_executor(_chroma_executor, call)
+
+
+def _degraded_hits(text: str, n_results: int, error: Exception) -> Optional[list[tuple[str, float]]]:
+    """
+    Vector leg failed: use the fallback index if there is one, else no vector
+    hits (lexical results only, hybrid mode) or re-raise (vector mode).
+    """
+    hits = _fallback_search(text, _vector_candidates(n_results))
+    if hits is None and RETRIEVAL_MODE != "hybrid":
+        raise error
+    using = f"{_fallback_embedder.name} fallback" if hits is not None else "lexical"
+    tracing.log(f"⚠️ Vector retrieval failed, using {using} results only: {error}")
+    return hits
+
+
+def query(text: str, n_results: int = 5) -> list[dict]:
+    """
+    Search the knowledge base for entries most relevant to the query text.
+    Returns a list of dicts with keys: id, service, category, question, answer,
+    score (vector similarity, or None if the vector leg was unavailable) and,
+    in hybrid mode, lexical (BM25 score).
+    """
+    query_embedding, vector_hits = None, None
+    if not is_ready():
+        # Still warming up: serve fallback-index (if any) and lexical results
+        return _fuse(text, _fallback_search(text, _vector_candidates(n_results)), None, n_results)
+    try:
+        query_embedding = embed_query(text)
+        vector_hits = query_ids_for_embedding(query_embedding, _vector_candidates(n_results))
+    except Exception as e:
+        query_embedding, vector_hits = None, _degraded_hits(text, n_results, e)
+    return _fuse(text, vector_hits, query_embedding, n_results)
+
+
+async def aquery(text: str, n_results: int = 5) -> list[dict]:
+    """Async variant of query()."""
+    return (await aquery_with_embedding(text, n_results))[0]
+
+
+async def aquery_with_embedding(text: str, n_results: int = 5) -> tuple[list[dict], Optional[np.ndarray]]:
+    """
+    Like aquery(), but also returns the query embedding used for the vector
+    leg, or None if there was none (still warming up, or embedding failed).
+    """
+    query_embedding, vector_hits = None, None
+    if not is_ready():
+        # Still warming up: serve fallback-index (if any) and lexical results
+        return _fuse(text, _fallback_search(text, _vector_candidates(n_results)), None, n_results), None
+    try:
+        query_embedding = await aembed_query(text)
+        vector_hits = await _off_loop(query_ids_for_embedding, query_embedding, _vector_candidates(n_results))
+    except Exception as e:
+        query_embedding, vector_hits = None, _degraded_hits(text, n_results, e)
+    return await _off_loop(_fuse, text, vector_hits, query_embedding, n_results), query_embedding
+
+
+def _fuse_many(texts, all_hits, embeddings, n_results) -> list[list[dict]]:
+    return [
+        _fuse(text, hits, embedding, n_results)
+        for text, hits, embedding in zip(texts, all_hits, embeddings)
+    ]
+
+
+def query_many(texts: list[str], n_results: int = 5) -> list[list[dict]]:
+    """
+    Batched query(): embeds all texts together and runs one vectorised search.
+    Returns one match list per input text, in order.
+    """
+    if not is_ready():
+        raise RuntimeError("Knowledge store not ready. Call initialize() first.")
+    if not texts:
+        return []
+    embeddings = embed_queries(texts)
+    all_hits = _vector_search_many(embeddings, _vector_candidates(n_results))
+    return _fuse_many(texts, all_hits, embeddings, n_results)
+
+
+async def aquery_many(texts: list[str], n_results: int = 5) -> list[list[dict]]:
+    """Async variant of query_many()."""
+    if not is_ready():
+        raise RuntimeError("Knowledge store not ready. Call initialize() first.")
+    if not texts:
+        return []
+    embeddings = await aembed_queries(texts)
+    all_hits = await _off_loop(_vector_search_many, embeddings, _vector_candidates(n_results))
+    return await _off_loop(_fuse_many, texts, all_hits, embeddings, n_results)
@@ -0,0 +1,86 @@
+"""
+Lexical Index — an in-memory BM25 inverted index over each entry's curated
+keywords, question and answer. Used as the lexical leg of hybrid retrieval;
+it needs no network and answers in well under a millisecond.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Iterable
+
+# Field weights: a keyword hit counts as much as three answer hits
+KEYWORD_WEIGHT = 3
+QUESTION_WEIGHT = 2
+ANSWER_WEIGHT = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the this to what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over weighted keyword/question/answer fields."""
+
+    def __init__(self, entries: Iterable, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: list[str] = []
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lengths = []
+
+        for doc_idx, entry in enumerate(entries):
+            self.ids.append(entry.id)
+            tf: Counter = Counter()
+            for keyword in entry.keywords:
+                tf.update({t: KEYWORD_WEIGHT for t in tokenize(keyword)})
+            for t in tokenize(entry.question):
+                tf[t] += QUESTION_WEIGHT
+            for t in tokenize(entry.answer):
+                tf[t] += ANSWER_WEIGHT
+            for term, freq in tf.items():
+                self.postings.setdefault(term, []).append((doc_idx, freq))
+            doc_lengths.append(sum(tf.values()))
+
+        n_docs = len(self.ids)
+        self.avg_length = (sum(doc_lengths) / n_docs) if n_docs else 0.0
+        self.length_norm = [
+            k1 * (1 - b + b * (length / self.avg_length)) if self.avg_length else k1
+            for length in doc_lengths
+        ]
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, text: str, n_results: int = 10) -> list[tuple[str, float]]:
+        """Return up to n_results (id, bm25_score) tuples with score > 0, best first."""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(text)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, freq in self.postings[term]:
+                tf = freq * (self.k1 + 1) / (freq + self.length_norm[doc_idx])
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:n_results]
+        return [(self.ids[doc_idx], round(score, 4)) for doc_idx, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[list[str]], k: int = 60) -> list[str]:
+    """Fuse several ranked id lists: score(id) = sum over lists of 1 / (k + rank)."""
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=lambda doc_id: fused[doc_id], reverse=True)
@@ -1,28 +1,65 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
+import asyncio
 import json
 import re
 import os
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 from google import genai
+import gemini_client
 import knowledge_store
+import kb_index
+import kb_loader
+import context_builder
+from caches import SemanticCache
+from prompt_cache import PromptCache
+from singleflight import SingleFlight
+import admission
+from admission import AdmissionGate, Overloaded, RateLimiter
+import session_store
+import metrics
+import tracing
 
 load_dotenv()
 
 # ─── Lifespan (startup/shutdown) ──────────────────────────────────────────────
 
+INDEX_RETRY_INTERVAL = float(os.getenv("INDEX_RETRY_INTERVAL", "30"))
+
+async def _warm_up_index():
+    """Load/ingest the knowledge store off the event loop, retrying on failure."""
+    while True:
+        try:
+            await asyncio.to_thread(knowledge_store.initialize, KNOWLEDGE_BASE)
+            print("✅ Knowledge store ready.")
+            return
+        except Exception as e:
+            print(f"❌ Knowledge store initialization failed: {e}. Retrying in {INDEX_RETRY_INTERVAL:.0f}s...")
+            await asyncio.sleep(INDEX_RETRY_INTERVAL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize ChromaDB knowledge store on startup."""
-    print("🚀 Starting up — initializing knowledge store...")
-    knowledge_store.initialize(KNOWLEDGE_BASE)
+    """Start serving immediately; warm up the ChromaDB knowledge store in the background."""
+    print("🚀 Starting up — initializing knowledge store in the background...")
+    warm_up = asyncio.create_task(_warm_up_index())
+    sweeper = asyncio.create_task(session_store.run_sweeper(sessions, SESSION_SWEEP_INTERVAL))
+    prompt_refresher = asyncio.create_task(system_prompt_cache.run()) if PROMPT_CACHE else None
     yield
+    warm_up.cancel()
+    sweeper.cancel()
+    if prompt_refresher is not None:
+        prompt_refresher.cancel()
+        await system_prompt_cache.aclose()
+    sessions.close()
+    knowledge_store.shutdown()
+    await gemini_client.aclose()
     print("👋 Shutting down.")
 
 app = FastAPI(title="e-Seba Manipur Chatbot API", lifespan=lifespan)
@@ -34,16 +71,143 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ─── Gemini LLM Client ───────────────────────────────────────────────────────
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per route template (time to response headers for streams)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or ("/static" if request.url.path.startswith("/static/") else "unmatched")
+        metrics.REQUESTS.inc(route=path, method=request.method, status=status)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, route=path)
+
+# Requests slower than this are logged with their stage breakdown
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Give each request an id (X-Request-ID, reused from the proxy when present)
+    and report where its time went as a Server-Timing header. Streaming
+    responses send headers before generation, so theirs cover retrieval only.
+    """
+    trace, token = tracing.start(tracing.new_request_id(request.headers.get("x-request-id")))
+    try:
+        response = await call_next(request)
+    finally:
+        tracing.finish(token)
+    if trace.handler_done is not None:
+        trace.add("serialize", time.perf_counter() - trace.handler_done)
+    response.headers["X-Request-ID"] = trace.request_id
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers["Timing-Allow-Origin"] = "*"
+    if trace.elapsed() * 1000 >= SLOW_REQUEST_MS:
+        print(f"[{trace.request_id}] 🐢 {request.method} {request.url.path} {response.status_code}: {trace.server_timing()}")
+    return response
 
-def _get_gemini_client() -> genai.Client:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY not set")
-    return genai.Client(api_key=api_key)
+# ─── Gemini LLM Client ───────────────────────────────────────────────────────
 
 GEMINI_MODEL = "gemini-2.5-flash"
 
+# With PROMPT_CACHE=1 the static system prompt is registered once as an
+# explicit Gemini context cache and referenced by name; it is sent inline
+# whenever no cache is live. Off by default: the current prompt is below the
+# model's minimum cacheable token count (1024), which the API rejects.
+PROMPT_CACHE = os.getenv("PROMPT_CACHE", "0") == "1"
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "3600"))
+
+# ─── AI answer cache ─────────────────────────────────────────────────────────
+# Keyed on (normalised message, retrieved KB ids); near-duplicate questions with
+# the same retrieved ids are matched on query-embedding cosine similarity.
+# Set ANSWER_CACHE_SIMILARITY=0 to disable near-duplicate matching.
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.97"))
+
+answer_cache = SemanticCache(
+    max_size=ANSWER_CACHE_SIZE,
+    ttl=ANSWER_CACHE_TTL,
+    similarity=ANSWER_CACHE_SIMILARITY or None,
+)
+knowledge_store.on_reingest(answer_cache.clear)
+
+# ─── Direct answers ──────────────────────────────────────────────────────────
+# Curated KB answers are returned verbatim (no generation) when the message
+# matches a KB question or unique multi-word keyword exactly, or the best retrieved match
+# scores at least DIRECT_ANSWER_SCORE. Set DIRECT_ANSWERS=0 to always generate.
+DIRECT_ANSWERS = os.getenv("DIRECT_ANSWERS", "1") == "1"
+DIRECT_ANSWER_SCORE = float(os.getenv("DIRECT_ANSWER_SCORE", "0.95"))
+
+# ─── Request coalescing ──────────────────────────────────────────────────────
+# Concurrent AI chat requests with the same normalised message share one
+# retrieval + generation (streamed chunks fan out to every waiter), so a burst
+# of identical questions costs one upstream call. Set COALESCE_REQUESTS=0 to
+# compute every request independently.
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "1") == "1"
+
+answer_flights = SingleFlight()
+
+# ─── Admission control ───────────────────────────────────────────────────────
+# At most UPSTREAM_CONCURRENCY Gemini-backed answers (query embedding, retrieval
+# and generation) are computed at once. Up to UPSTREAM_QUEUE_SIZE more wait at
+# most UPSTREAM_QUEUE_TIMEOUT seconds, free-text chat ahead of bulk retrieval;
+# beyond that requests get an immediate 503 with Retry-After. Browse
+# (/api/chat) and exact KB matches make no upstream calls and never queue.
+# Per phone number, AI_RATE_PER_MIN free-text messages (bursts of
+# AI_RATE_BURST) and BROWSE_RATE_PER_MIN browse actions are allowed per minute;
+# excess gets a 429 with Retry-After. A rate of 0 disables that limit.
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "8"))
+UPSTREAM_QUEUE_SIZE = int(os.getenv("UPSTREAM_QUEUE_SIZE", "32"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "5"))
+AI_RATE_PER_MIN = float(os.getenv("AI_RATE_PER_MIN", "12"))
+AI_RATE_BURST = float(os.getenv("AI_RATE_BURST", "5"))
+BROWSE_RATE_PER_MIN = float(os.getenv("BROWSE_RATE_PER_MIN", "120"))
+BROWSE_RATE_BURST = float(os.getenv("BROWSE_RATE_BURST", "30"))
+
+upstream_gate = AdmissionGate(
+    limit=UPSTREAM_CONCURRENCY,
+    max_queue=UPSTREAM_QUEUE_SIZE,
+    max_wait=UPSTREAM_QUEUE_TIMEOUT,
+)
+ai_rate_limit = RateLimiter(AI_RATE_PER_MIN / 60, AI_RATE_BURST) if AI_RATE_PER_MIN > 0 else None
+browse_rate_limit = RateLimiter(BROWSE_RATE_PER_MIN / 60, BROWSE_RATE_BURST) if BROWSE_RATE_PER_MIN > 0 else None
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Shed load fast: 429 (rate limit) or 503 (queue full / timed out) with Retry-After."""
+    metrics.SHED.inc(reason=exc.reason)
+    if exc.status_code == 429:
+        detail = "You are sending messages too quickly. Please wait a moment and try again."
+    else:
+        detail = "The assistant is busy right now. Please try again shortly, or use the Browse Topics tab."
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _check_rate(limiter: Optional[RateLimiter], session_id: str, session: dict) -> None:
+    """Charge one request to the session's phone number (or the session, if it has none)."""
+    if limiter is not None:
+        limiter.check(session.get("user", {}).get("phone") or session_id)
+
+
+# ─── Prompt context ──────────────────────────────────────────────────────────
+# Retrieved passages are packed into at most CONTEXT_TOKEN_BUDGET (estimated)
+# tokens, each answer trimmed to its most relevant sentences within
+# CONTEXT_PASSAGE_TOKENS; near-duplicates and matches scoring at or below
+# CONTEXT_MIN_SCORE are dropped (see context_builder.py).
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+CONTEXT_PASSAGE_TOKENS = int(os.getenv("CONTEXT_PASSAGE_TOKENS", "160"))
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.5"))
+CONTEXT_DEDUPE_SIMILARITY = float(os.getenv("CONTEXT_DEDUPE_SIMILARITY", "0.8"))
 
 
 def normalize_query(q: str) -> str:
@@ -54,1331 +218,137 @@ def normalize_query(q: str) -> str:
 
 # ─── Knowledge Base ───────────────────────────────────────────────────────────
 
-KNOWLEDGE_BASE =[
-  {
-    "id": "landing_page_001",
-    "service": "General",
-    "category": "Navigation",
-    "question": "What options are available on the e-Seba Manipur landing page?",
-    "answer": "The e-Seba Manipur landing page has a top navigation bar with: HOME, APPLICATION STATUS, CERTIFICATE DOWNLOAD, CONTACT US, and LOGIN. The hero section has two main action buttons: 'Citizen Services - Register & Apply' (blue button) for new users or starting a new application, and 'Track Application Status' (outlined button) to check pending applications without logging in.",
-    "keywords": [
-      "landing page",
-      "navigation",
-      "home",
-      "eseba",
-      "manipur",
-      "menu"
-    ]
-  },
-  {
-    "id": "landing_page_002",
-    "service": "General",
-    "category": "Navigation",
-    "question": "How can I track my application status without logging in?",
-    "answer": "You can track your application status without logging in by clicking the 'Track Application Status' button on the landing page hero section, or by clicking 'APPLICATION STATUS' in the top navigation bar.",
-    "keywords": [
-      "track",
-      "application status",
-      "without login",
-      "guest",
-      "check status"
-    ]
-  },
-  {
-    "id": "landing_page_003",
-    "service": "General",
-    "category": "Navigation",
-    "question": "How do I download a certificate from e-Seba Manipur?",
-    "answer": "You can download approved certificates by clicking 'CERTIFICATE DOWNLOAD' in the top navigation bar on the landing page.",
-    "keywords": [
-      "certificate download",
-      "download",
-      "approved certificate",
-      "navigation"
-    ]
-  },
-
-
-    {
-    "id": "login_000",
-    "service": "Login",
-    "category": "Overview",
-    "question": "about login?",
-    "answer": "In this login section, you can find info about the login methods available on e-Seba Manipur, including Mobile OTP and Username/Password login. It also explains the captcha security feature and provides step-by-step instructions for both login methods.",
-    "keywords": [
-      "login",
-      "mobile OTP",
-      "username",
-      "password",
-      "sign in"
-    ]
-  },
-
-  {
-    "id": "login_001",
-    "service": "Login",
-    "category": "Login",
-    "question": "What are the login methods available on e-Seba Manipur?",
-    "answer": "e-Seba Manipur offers two login methods: (1) Mobile OTP – login using your registered mobile number and a One-Time Password sent via SMS, and (2) Username – login using the username and password you created during registration.",
-    "keywords": [
-      "login",
-      "mobile OTP",
-      "username",
-      "password",
-      "sign in"
-    ]
-  },
-  {
-    "id": "login_002",
-    "service": "Login",
-    "category": "Login",
-    "question": "How do I log in using my mobile number on e-Seba Manipur?",
-    "answer": "To log in using your mobile number: (1) Go to the Login page, (2) Select the 'Mobile OTP' tab, (3) Enter your registered 10-digit mobile number, (4) Solve the captcha math problem, (5) Click 'Send OTP', (6) Enter the 6-digit OTP received via SMS, and (7) Submit to log in.",
-    "keywords": [
-      "mobile OTP",
-      "login",
-      "OTP",
-      "mobile number",
-      "sign in"
-    ]
-  },
-  {
-    "id": "login_003",
-    "service": "Login",
-    "category": "Login",
-    "question": "How do I log in using my username and password?",
-    "answer": "To log in with username and password: (1) Go to the Login page, (2) Select the 'Username' tab, (3) Enter your registered username, (4) Enter your password, (5) Solve the captcha math problem, and (6) Click the 'Login' button.",
-    "keywords": [
-      "username",
-      "password",
-      "login",
-      "sign in",
-      "credentials"
-    ]
-  },
-  {
-    "id": "login_004",
-    "service": "Login",
-    "category": "Login",
-    "question": "What is the captcha on the login page?",
-    "answer": "The captcha on the e-Seba Manipur login page is a simple math challenge (e.g., '1 + 7 = ?'). You need to solve the math problem and enter the answer in the provided field. This is a security measure to prevent automated bot attacks.",
-    "keywords": [
-      "captcha",
-      "math",
-      "security",
-      "login",
-      "bot prevention"
-    ]
-  },
-
-   {
-    "id": "registration_000",
-    "service": "New Registration",
-    "category": "Overview",
-    "question": "About Registration?",
-    "answer": "In this registration section, you can find detailed information about the new registration process on e-Seba Manipur. It covers the step-by-step procedure to create a new account, the personal details required, the credentials you need to set, and important tips for successful registration.",
-    "keywords": [
-      "register",
-      "new account",
-      "sign up",
-      "create account",
-      "registration"
-    ]
-  },
-
-  {
-    "id": "registration_001",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "How do I register a new account on e-Seba Manipur?",
-    "answer": "To register a new account: (1) Go to the login page, (2) Click 'Don't have an account? Register here', (3) Enter your 10-digit mobile number and solve the captcha, (4) Click 'Send OTP', (5) Enter the 6-digit OTP and click 'Verify OTP', (6) Fill in your personal details form, and (7) Set your username, password, and address details, then click 'Next' to complete registration.",
-    "keywords": [
-      "register",
-      "new account",
-      "sign up",
-      "create account",
-      "registration"
-    ]
-  },
-  {
-    "id": "registration_002",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "What is the first step in the registration process?",
-    "answer": "The first step in registration is Mobile Verification. You must enter a valid 10-digit mobile number, solve the captcha math problem, and click 'Send OTP'. A 6-digit verification code will be sent to your mobile number.",
-    "keywords": [
-      "registration",
-      "first step",
-      "mobile verification",
-      "OTP",
-      "mobile number"
-    ]
-  },
-  {
-    "id": "registration_003",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "What personal details are required during registration?",
-    "answer": "Mandatory personal details required during registration include: First Name, Last Name, Email address, Date of Birth, Gender, Marital Status, Citizen/CSC type, Name as per Aadhaar, Aadhaar Number (12-digit), Father's Name, Mother's Name, Caste Category, Religion, and Area. Optional fields include Middle Name and Spouse Name (if married).",
-    "keywords": [
-      "registration",
-      "personal details",
-      "required fields",
-      "mandatory",
-      "aadhaar",
-      "name"
-    ]
-  },
-  {
-    "id": "registration_004",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "What credentials do I need to create during registration?",
-    "answer": "During registration, you need to create a unique Username (which you'll use to log in) and a Password. The password field has an eye icon to toggle visibility. These credentials are set in the 'Credential Details' section of the registration form.",
-    "keywords": [
-      "username",
-      "password",
-      "credentials",
-      "registration",
-      "create account"
-    ]
-  },
-  {
-    "id": "registration_005",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "Do I need to enter both present and permanent address during registration?",
-    "answer": "Yes, both Present Address and Permanent Address are required during registration. However, if your present and permanent addresses are the same, you can check the 'Present address is same as Permanent' checkbox to automatically copy the present address fields to the permanent address section, saving time.",
-    "keywords": [
-      "address",
-      "present address",
-      "permanent address",
-      "registration",
-      "same address",
-      "checkbox"
-    ]
-  },
-  {
-    "id": "registration_006",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "What happens after I verify my OTP during registration?",
-    "answer": "After successfully verifying your OTP, you are directed to the detailed registration form (Step 3: Personal Details Form) where you fill in your demographic and identity information including name, email, date of birth, gender, Aadhaar details, and other personal information.",
-    "keywords": [
-      "OTP",
-      "verified",
-      "after OTP",
-      "registration",
-      "next step",
-      "personal details"
-    ]
-  },
-  {
-    "id": "registration_007",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "What if I don't receive the OTP during registration?",
-    "answer": "If you don't receive the OTP, you can click the 'Resent OTP' link on the OTP confirmation screen to request a new verification code. Make sure the mobile number you entered is correct and active.",
-    "keywords": [
-      "resend OTP",
-      "OTP not received",
-      "registration",
-      "OTP expired",
-      "new OTP"
-    ]
-  },
-  {
-    "id": "registration_008",
-    "service": "New Registration",
-    "category": "Registration",
-    "question": "What address fields are required during registration?",
-    "answer": "For both Present and Permanent Address, the following fields are required: Address (house/street), City/Town, District, Pincode, Post Office, and Police Station.",
-    "keywords": [
-      "address fields",
-      "registration",
-      "city",
-      "district",
-      "pincode",
-      "post office",
-      "police station"
-    ]
-  },
-
-  
-  {
-    "id": "dashboard_001",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What can I do from the user dashboard on e-Seba Manipur?",
-    "answer": "From the user dashboard you can: Apply for government services, view your applied, pending, issued, and rejected applications, change your password, edit or view your profile, track application status, download certificates, and see a summary of all your application counts and recent activity.",
-    "keywords": [
-      "dashboard",
-      "features",
-      "overview",
-      "what can I do",
-      "home page"
-    ]
-  },
-  {
-    "id": "dashboard_002",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What KPI cards are shown on the dashboard?",
-    "answer": "The dashboard displays four KPI cards: (1) Total Applications – count of all applications ever started, (2) Saved Drafts – incomplete applications that can be resumed, (3) Submitted – applications sent for processing, and (4) Issued – completed requests where certificates have been generated.",
-    "keywords": [
-      "KPI",
-      "dashboard cards",
-      "total applications",
-      "drafts",
-      "submitted",
-      "issued"
-    ]
-  },
-  {
-    "id": "dashboard_003",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What are the sidebar menu options on the dashboard?",
-    "answer": "The sidebar menu includes: Dashboard (main view), Apply Services (browse available services), Applications (with sub-options: Applied List, Pending List, Issued List, Rejected List), Account (with sub-options: Change Password, Edit Profile, View Profile), and Logout.",
-    "keywords": [
-      "sidebar",
-      "menu",
-      "navigation",
-      "dashboard",
-      "options"
-    ]
-  },
-  {
-    "id": "dashboard_004",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What is the 'Pending List' in my dashboard?",
-    "answer": "The 'Pending List' under Applications in your dashboard shows all your applications that are currently waiting for government action or processing. These are applications you have submitted but have not yet been approved, issued, or rejected.",
-    "keywords": [
-      "pending list",
-      "pending applications",
-      "waiting",
-      "government action",
-      "dashboard"
-    ]
-  },
-  {
-    "id": "dashboard_005",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "How do I start a new application from the dashboard?",
-    "answer": "You can start a new application in two ways from the dashboard: (1) Click 'Apply Services' in the sidebar menu to browse all available government services, or (2) Use the 'New Application' quick action button in the main content area.",
-    "keywords": [
-      "new application",
-      "apply services",
-      "start application",
-      "dashboard",
-      "quick action"
-    ]
-  },
-  {
-    "id": "employment_000",
-    "service": "Employment Exchange",
-    "category": "Overview",
-    "question": "What is the Employment Exchange Registration service on e-Seba Manipur?",
-    "answer": "The Employment Exchange Registration service on e-Seba Manipur allows citizens to register as job seekers. E seba provides five types of Employment Exchange services namely Registration in Employment Exchange, Renewal of Employment Exchange Registration, Application against vacancy, Transfer of registration to employment exchange, Updating qualification or experience. Users can also do Job Seeker Profile Update, Job Seeker Profile View, and Employment Exchange Certificate Download. Through this service, you can store your qualifications, work experience, and job preferences, upload required documents, and submit an application to the Employment Exchange. After submission, you can track your application status and download an acknowledgement receipt.",
-    "keywords": [
-      "employment exchange",
-      "registration",
-      "job seeker",
-      "employment",
-      "e-seba"
-    ]
-  },
-  {
-    "id": "employment_002",
-    "service": "Employment Exchange",
-    "category": "Navigation",
-    "question": "How do I navigate to the Employment Exchange Registration on e-Seba Manipur?",
-    "answer": "To reach the Employment Exchange Registration: (1) Log in and go to your Dashboard, (2) Click 'Apply Services' in the sidebar, (3) Choose 'Employment Exchange', (4) Select 'Registration in Employment Exchange', and (5) Click 'New Registration'.",
-    "keywords": [
-      "how to navigate",
-      "employment exchange",
-      "find service",
-      "apply services",
-      "new registration"
-    ]
-  },
-  {
-    "id": "employment_003",
-    "service": "Employment Exchange",
-    "category": "Process",
-    "question": "What are the steps involved in the Employment Exchange Registration?",
-    "answer": "The Employment Exchange Registration is divided into 6 main steps shown in a progress tracker: (1) Personal – basic personal information, (2) Address – present and permanent address, (3) Qualification – educational qualifications, (4) Language – languages known, (5) Others – physical, caste, willingness, and other details, and (6) Uploads – required documents.",
-    "keywords": [
-      "steps",
-      "employment exchange",
-      "registration process",
-      "6 steps",
-      "progress"
-    ]
-  },
-  {
-    "id": "employment_004",
-    "service": "Employment Exchange",
-    "category": "Qualification",
-    "question": "How do I add my educational qualification in the Employment Exchange Registration?",
-    "answer": "In Step 3 (Qualification), click 'Add Qualification' to open a popup form. Fill in: Exam Passed (e.g., 8th, 10th, 12th, Graduation), Board/University, Subjects (click + to add multiple), Division/Grade, Year of Passing (digits only), Course Duration (years), School/Institute Name, Medium (e.g., English, Manipuri), and Percentage/CGPA. Click 'Add' to save. You can add multiple qualifications.",
-    "keywords": [
-      "qualification",
-      "add qualification",
-      "education",
-      "exam",
-      "board",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_005",
-    "service": "Employment Exchange",
-    "category": "Experience",
-    "question": "How do I add work experience in the Employment Exchange Registration?",
-    "answer": "In Step 4 (Experience), select 'Yes' for 'Do you have Experience?' Then click 'Add Experience' to open a popup form. Fill in: Name of Employer/Company, Pay on Leaving (per month), From Date, To Date, Nature of Work, Experience Type (Full-time/Part-time/Contract/Internship), Type of Job, Post Held, and Reason for Leaving. Click 'Add' to save. You can add multiple experiences.",
-    "keywords": [
-      "experience",
-      "work experience",
-      "add experience",
-      "employer",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_006",
-    "service": "Employment Exchange",
-    "category": "Experience",
-    "question": "What types of experience can I add in the Employment Exchange Registration?",
-    "answer": "You can add various types of experience: Experience Type options include Full-time, Part-time, Contract, and Internship. Type of Job options include Administration, Technical, Skilled, Unskilled, and Office Assistance.",
-    "keywords": [
-      "experience type",
-      "full-time",
-      "part-time",
-      "contract",
-      "internship",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_007",
-    "service": "Employment Exchange",
-    "category": "Language",
-    "question": "How do I add languages in the Employment Exchange Registration?",
-    "answer": "In Step 5 (Language), click 'Add Language' to add a language entry. The language table has columns for: Serial No., Language Known, Read (Yes/No), Speak (Yes/No), Write (Yes/No), and Action (Edit/Delete). You can specify your proficiency in reading, speaking, and writing for each language added.",
-    "keywords": [
-      "language",
-      "add language",
-      "read",
-      "speak",
-      "write",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_008",
-    "service": "Employment Exchange",
-    "category": "Others",
-    "question": "What information is collected in the 'Others' step of Employment Exchange Registration?",
-    "answer": "Step 6 (Others) collects four categories of information: (1) Physical Standard – height, weight, chest, glasses, sports, NCC level, disability, ex-serviceman status, blood group; (2) Caste Details – main caste, sub caste, certificate info; (3) Willingness Details – employment sector, vacancy, training willingness; and (4) Other Details – preferred work location, employment status, residence proof, expected salary, and state/central priorities.",
-    "keywords": [
-      "others",
-      "physical standard",
-      "caste details",
-      "willingness",
-      "employment exchange",
-      "step 6"
-    ]
-  },
-  {
-    "id": "employment_009",
-    "service": "Employment Exchange",
-    "category": "Others",
-    "question": "What physical details are required in the Employment Exchange Registration?",
-    "answer": "The Physical Standard section requires: Wear Glasses (Yes/No), Height (in cm), Weight (in kg), Chest (in cm), Main Sport (dropdown), Sports Level (dropdown), Sports Grade (dropdown), NCC Level (dropdown), Disability more than 40% (Yes/No), Disability Type (if applicable), Whether Ex-serviceman (Yes/No), and Blood Group (dropdown).",
-    "keywords": [
-      "physical standard",
-      "height",
-      "weight",
-      "disability",
-      "blood group",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_010",
-    "service": "Employment Exchange",
-    "category": "Uploads",
-    "question": "What documents are required to be uploaded for Employment Exchange Registration?",
-    "answer": "Required uploads include: (1) Passport Photo (plain background, under 100 KB), (2) Aadhaar Card front image (under 100 KB), (3) Aadhaar Card back image (under 100 KB), (4) Qualification Certificates, (5) Experience Certificates (if applicable), (6) Proof of Residence, (7) Domicile Certificate, (8) Caste Certificate, (9) Date of Birth Certificate, and (10) Other Documents as required.",
-    "keywords": [
-      "documents",
-      "uploads",
-      "required documents",
-      "aadhaar",
-      "passport photo",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_011",
-    "service": "Employment Exchange",
-    "category": "Uploads",
-    "question": "What is the maximum file size for uploads in Employment Exchange Registration?",
-    "answer": "The maximum file size for uploads is 100 KB per file. This applies to passport photos, Aadhaar card images (front and back), and other supporting documents. Make sure all your files are compressed to under 100 KB before uploading.",
-    "keywords": [
-      "file size",
-      "upload limit",
-      "100 KB",
-      "photo size",
-      "document size",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_012",
-    "service": "Employment Exchange",
-    "category": "Uploads",
-    "question": "What are the requirements for the passport photo upload?",
-    "answer": "The passport photo must have a plain background and the file size must be under 100 KB. Make sure the photo clearly shows your face and meets standard passport photo requirements.",
-    "keywords": [
-      "passport photo",
-      "photo requirements",
-      "plain background",
-      "upload",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_013",
-    "service": "Employment Exchange",
-    "category": "Uploads",
-    "question": "How do I select a processing office for my Employment Exchange Registration?",
-    "answer": "In the Uploads step (Step 6), there is a 'Processing Office Selection' section where you need to select your District (e.g., Imphal West) and then choose your Processing Office from a dropdown list.",
-    "keywords": [
-      "processing office",
-      "district",
-      "office selection",
-      "employment exchange",
-      "uploads"
-    ]
-  },
-  {
-    "id": "employment_014",
-    "service": "Employment Exchange",
-    "category": "Submission",
-    "question": "What is the declaration I need to agree to before submitting my Employment Exchange Registration?",
-    "answer": "Before submitting, you must read and check the declaration checkbox that states: 'I agree and Continue'. The declaration warns that if any information furnished by the applicant turns out to be false, the registration is liable to be cancelled. This checkbox is mandatory for submission.",
-    "keywords": [
-      "declaration",
-      "agree",
-      "I agree",
-      "terms",
-      "submission",
-      "false information",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_015",
-    "service": "Employment Exchange",
-    "category": "Submission",
-    "question": "What are the two save/submit options available before final submission of Employment Exchange Registration?",
-    "answer": "Before final submission, there are two buttons: (1) 'Save All' – saves your progress without final submission, allowing you to return later to complete the application; and (2) 'Submit Application' – finalizes and submits your application for processing.",
-    "keywords": [
-      "save all",
-      "submit application",
-      "save draft",
-      "submit",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_016",
-    "service": "Employment Exchange",
-    "category": "Submission",
-    "question": "What happens after I successfully submit my Employment Exchange Registration?",
-    "answer": "After successful submission, a popup appears showing: (1) A success message 'Application Submitted Successfully', (2) Your Application Number (e.g., 16/20260218002), and (3) A reminder to keep this number for future reference and for tracking. You can click 'Download' to save your acknowledgement receipt or 'Okay' to close the popup.",
-    "keywords": [
-      "after submission",
-      "application submitted",
-      "application number",
-      "acknowledgement",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_017",
-    "service": "Employment Exchange",
-    "category": "Submission",
-    "question": "How do I download my Employment Exchange application receipt?",
-    "answer": "After successful submission, a popup appears with a 'Download' button that lets you download your acknowledgement receipt. You can also download it later by going to Sidebar → Applications → Applied List, finding your application, and clicking the download (⬇) icon.",
-    "keywords": [
-      "download receipt",
-      "acknowledgement",
-      "receipt",
-      "application number",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_018",
-    "service": "Employment Exchange",
-    "category": "Tracking",
-    "question": "How do I track my Employment Exchange Registration application?",
-    "answer": "To track your application: Go to Sidebar → Applications → Applied List. You will see a table with your Application No, Applicant Name, Date of Submission, and Status. Click the View (👁) icon to see a detailed Application Status Timeline, which shows each stage (e.g., Submitted) with date, time, and status message.",
-    "keywords": [
-      "track application",
-      "application status",
-      "applied list",
-      "tracking",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_019",
-    "service": "Employment Exchange",
-    "category": "Tracking",
-    "question": "What does 'Submitted' status mean in the Applied List?",
-    "answer": "A 'Submitted' status means your Employment Exchange Registration application has been successfully submitted and an acknowledgement receipt has been generated. Your application is now waiting for government officials to review and process it.",
-    "keywords": [
-      "submitted status",
-      "application status",
-      "applied list",
-      "acknowledgement",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_020",
-    "service": "Employment Exchange",
-    "category": "Tracking",
-    "question": "How do I search for my application in the Applied List?",
-    "answer": "In the Applied List (Sidebar → Applications → Applied List), there is a search bar where you can search for your application by entering your Application Number.",
-    "keywords": [
-      "search application",
-      "applied list",
-      "application number",
-      "find application",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_021",
-    "service": "Employment Exchange",
-    "category": "Others",
-    "question": "What willingness details are required in the Employment Exchange Registration?",
-    "answer": "The Willingness Details section requires: Employment Sector Willingness, Vacancy Willingness, Other Willingness, Whether Willing to Undergo Training (Yes/No), Whether Willing to Specify Trade(s) (Yes/No), and Non-Availability period (From Date and To Date – for dates when you are not available).",
-    "keywords": [
-      "willingness",
-      "employment sector",
-      "training",
-      "non-availability",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_022",
-    "service": "Employment Exchange",
-    "category": "Others",
-    "question": "What salary details do I need to provide in the Employment Exchange Registration?",
-    "answer": "In the 'Other Details' section of Step 6, you need to provide: Expected Minimum Salary for Outside Job (Rs per month) and Expected Minimum Salary for Local Job (Rs per month).",
-    "keywords": [
-      "salary",
-      "expected salary",
-      "minimum salary",
-      "outside job",
-      "local job",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_023",
-    "service": "Employment Exchange",
-    "category": "Others",
-    "question": "What is the caste certificate information required in Employment Exchange Registration?",
-    "answer": "The Caste Details section requires: Main Caste (dropdown), Sub Caste (dropdown), Center Name, Certificate No. (enter N/A if not available), Certificate Issued Date, Certificate Issued By Whom (enter N/A if not available), and Remark.",
-    "keywords": [
-      "caste certificate",
-      "caste details",
-      "sub caste",
-      "certificate number",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_024",
-    "service": "Employment Exchange",
-    "category": "Rules",
-    "question": "What are the important rules to remember when filling the Employment Exchange Registration?",
-    "answer": "Key rules: (1) Fields marked with * are mandatory, (2) Passport photo and Aadhaar images must be under 100 KB, (3) Enter 'N/A' where certificate details are not available (as instructed), (4) You must tick 'I agree and Continue' before submitting, (5) False information can lead to cancellation of registration, (6) Always save or download your acknowledgement receipt after submission.",
-    "keywords": [
-      "rules",
-      "mandatory fields",
-      "file size",
-      "N/A",
-      "important tips",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_025",
-    "service": "Employment Exchange",
-    "category": "Rules",
-    "question": "What happens if I provide wrong information in my Employment Exchange Registration?",
-    "answer": "The declaration on the application form states that if any information furnished by the applicant turns out to be false, your registration is liable to be cancelled. Therefore, ensure all details entered are accurate and truthful.",
-    "keywords": [
-      "false information",
-      "wrong information",
-      "cancellation",
-      "registration cancelled",
-      "employment exchange"
-    ]
-  },
-  {
-    "id": "employment_026",
-    "service": "Employment Exchange",
-    "category": "Others",
-    "question": "What is the 'State Priority' in the Employment Exchange Registration Other Details section?",
-    "answer": "The 'State Priority' is a dropdown field in the Other Details section where you can select your priority for state government employment. If you set State Priority or Priority for Central to 'Yes', you must additionally provide: Certificate No., Certifying Authority, Period of Work(s), and Certificate Date.",
-    "keywords": [
-      "state priority",
-      "central priority",
-      "employment exchange",
-      "priority",
-      "certificate"
-    ]
-  },
-
-  {
-    "id": "general_000",
-    "service": "General",
-    "category": "Overview",
-    "question": "what info can i get from settings menu?",
-    "answer": "The settings menu in e-Seba Manipur allows you to manage your account preferences, update your profile information, change your password, and view account-related details.",
-    "keywords": [
-      "change password",
-      "password",
-      "account",
-      "security",
-      "update password"
-    ]
-  },
-
-  {
-    "id": "general_001",
-    "service": "General",
-    "category": "Account",
-    "question": "How do I change my password on e-Seba Manipur?",
-    "answer": "To change your password, log in to your account and go to the sidebar menu. Under the 'Account' section, click 'Change Password'. Enter your current and new password to update it.",
-    "keywords": [
-      "change password",
-      "password",
-      "account",
-      "security",
-      "update password"
-    ]
-  },
-  {
-    "id": "general_002",
-    "service": "General",
-    "category": "Account",
-    "question": "How do I edit my profile on e-Seba Manipur?",
-    "answer": "To edit your profile, log in and go to the sidebar menu. Under the 'Account' section, click 'Edit Profile' to update your personal information.",
-    "keywords": [
-      "edit profile",
-      "update profile",
-      "account",
-      "personal information"
-    ]
-  },
-  {
-    "id": "general_003",
-    "service": "General",
-    "category": "Account",
-    "question": "How do I log out of e-Seba Manipur?",
-    "answer": "To log out, click 'Logout' at the bottom of the sidebar menu in your dashboard. This will end your current session.",
-    "keywords": [
-      "logout",
-      "sign out",
-      "end session",
-      "account"
-    ]
-  },
-  {
-    "id": "general_004",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What is a 'Saved Draft' on the dashboard?",
-    "answer": "A 'Saved Draft' is an incomplete application that you have saved but not yet submitted. You can resume these applications later. The number of saved drafts is displayed as a KPI card on the dashboard.",
-    "keywords": [
-      "saved draft",
-      "draft",
-      "incomplete application",
-      "resume application",
-      "dashboard"
-    ]
-  },
-  {
-    "id": "general_005",
-    "service": "General",
-    "category": "Registration",
-    "question": "Is Aadhaar number mandatory for registration on e-Seba Manipur?",
-    "answer": "Yes, the Aadhaar Number (12-digit unique identity number) is mandatory for registration on e-Seba Manipur. You also need to provide your Name as per Aadhaar, which must match your Aadhaar card exactly.",
-    "keywords": [
-      "aadhaar",
-      "mandatory",
-      "aadhaar number",
-      "registration",
-      "required"
-    ]
-  },
-  {
-    "id": "general_006",
-    "service": "General",
-    "category": "Contact",
-    "question": "How can I contact support for e-Seba Manipur?",
-    "answer": "You can contact e-Seba Manipur support by clicking 'CONTACT US' in the top navigation bar of the landing page. This will provide you with contact information for support.",
-    "keywords": [
-      "contact",
-      "support",
-      "help",
-      "contact us",
-      "helpline"
-    ]
-  },
-  {
-    "id": "general_007",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What does the 'Issued List' in my dashboard show?",
-    "answer": "The 'Issued List' under Applications in your dashboard shows all applications that have been successfully approved and for which certificates have been generated. You can download these certificates from the Issued List.",
-    "keywords": [
-      "issued list",
-      "approved",
-      "certificate generated",
-      "completed applications",
-      "dashboard"
-    ]
-  },
-  {
-    "id": "general_008",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What does the 'Rejected List' in my dashboard show?",
-    "answer": "The 'Rejected List' under Applications in your dashboard shows all applications that were denied or rejected by the government department. You may need to re-apply or resolve the issues mentioned in the rejection.",
-    "keywords": [
-      "rejected list",
-      "rejected application",
-      "denied",
-      "application rejected",
-      "dashboard"
-    ]
-  },
-  {
-    "id": "general_009",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What is the Status Distribution chart on the dashboard?",
-    "answer": "The Status Distribution is a visual donut chart on the dashboard that provides a graphical representation of all your application statuses — showing the proportion of Submitted, In Progress, Issued, and Rejected applications at a glance.",
-    "keywords": [
-      "status distribution",
-      "donut chart",
-      "chart",
-      "visual",
-      "application overview",
-      "dashboard"
-    ]
-  },
-  {
-    "id": "general_010",
-    "service": "General",
-    "category": "Dashboard",
-    "question": "What is the 'Recent Activity' section on the dashboard?",
-    "answer": "The 'Recent Activity' section on the dashboard is a timeline log that shows your latest actions and application events. It helps you quickly see what you have recently done on the portal.",
-    "keywords": [
-      "recent activity",
-      "timeline",
-      "activity log",
-      "dashboard",
-      "latest actions"
-    ]
-  }
-  ,
-  ### newly added about revenue department
-  {
-  "id": "revenue_overview_000",
-  "service": "Revenue Department",
-  "category": "Overview",
-  "question": "What services are available under the Revenue Department on e-Seba Manipur?",
-  "answer": "The Revenue Department on e-Seba Manipur provides online services for applying for various certificates. These include OBC Certificate, Permanent Resident Certificate (PRC), Income Certificate, Domicile Certificate, ST Certificate, and SC Certificate. Citizens can apply online, upload required documents, track application status, and download certificates once approved.",
-  "keywords": [
-    "revenue department",
-    "e-seba",
-    "certificates",
-    "manipur",
-    "online services"
-  ]
-},
-{
-  "id": "income_001",
-  "service": "Revenue Department",
-  "category": "Income certificate",
-  "question": "What is the Income Certificate service on e-Seba Manipur?",
-  "answer": "The Income Certificate service on e-Seba Manipur allows citizens to apply online for an official certificate that proves their annual income. This certificate is commonly required for scholarships, government schemes, fee concessions, and other official purposes. Applicants can submit the form online, upload documents, track status, and download the certificate after approval.",
-  "keywords": [
-    "income certificate",
-    "revenue department",
-    "e-seba",
-    "income proof",
-    "manipur"
-  ]
-},
-
-{
-  "id": "prc_001",
-  "service": "Revenue Department",
-  "category": "Permanent Resident Certificate",
-  "question": "What is the Permanent Resident Certificate (PRC) service?",
-  "answer": "The Permanent Resident Certificate (PRC) service allows citizens to apply online for a certificate that proves they are a permanent resident of Manipur. This certificate is often required for education, government jobs, and other official purposes. Users can apply online, upload documents, and track their application status on e-Seba Manipur.",
-  "keywords": [
-    "prc",
-    "permanent resident certificate",
-    "manipur",
-    "residency proof",
-    "e-seba"
-  ]
-},
-{
-  "id": "domicile_001",
-  "service": "Revenue Department",
-  "category": "Domicile certificate",
-  "question": "What is the Domicile Certificate service on e-Seba Manipur?",
-  "answer": "The Domicile Certificate service allows citizens to apply for an official document that certifies their domicile status in Manipur. This certificate is used for admissions, government jobs, and various government schemes. The application can be submitted online through e-Seba Manipur.",
-  "keywords": [
-    "domicile certificate",
-    "manipur",
-    "residence proof",
-    "government service",
-    "e-seba"
-  ]
-},
-{
-  "id": "obc_001",
-  "service": "Revenue Department",
-  "category": "OBC Certificate",
-  "question": "What is the OBC Certificate service?",
-  "answer": "The OBC Certificate service allows eligible citizens to apply online for an Other Backward Class (OBC) certificate. This certificate is used to claim reservation benefits in education, jobs, and government schemes. Applicants can apply, upload documents, and track their application on e-Seba Manipur.",
-  "keywords": [
-    "obc certificate",
-    "backward class",
-    "reservation",
-    "e-seba",
-    "manipur"
-  ]
-},
-{
-  "id": "sc_001",
-  "service": "Revenue Department",
-  "category": "SC Certificate",
-  "question": "What is the SC Certificate service?",
-  "answer": "The SC Certificate service allows eligible citizens to apply online for a Scheduled Caste (SC) certificate. This certificate is required to avail reservation benefits in education, employment, and government schemes. The entire application process can be completed through e-Seba Manipur.",
-  "keywords": [
-    "sc certificate",
-    "scheduled caste",
-    "reservation",
-    "e-seba",
-    "manipur"
-  ]
-},
-{
-  "id": "st_001",
-  "service": "Revenue Department",
-  "category": "ST Certificate",
-  "question": "What is the ST Certificate service?",
-  "answer": "The ST Certificate service allows eligible citizens to apply online for a Scheduled Tribe (ST) certificate. This certificate is used for claiming reservation benefits in education, jobs, and government welfare schemes. Users can apply and track their application through e-Seba Manipur.",
-  "keywords": [
-    "st certificate",
-    "scheduled tribe",
-    "reservation",
-    "e-seba",
-    "manipur"
-  ]
-},
-{
-  "id": "common_001",
-  "service": "Revenue Department",
-  "category": "Application Process",
-  "question": "How can I apply for any certificate under the Revenue Department on e-Seba Manipur?",
-  "answer": "To apply for any certificate, select the required service such as Income Certificate, PRC, OBC, SC, ST, or Domicile Certificate, click on 'Apply Now', fill in the application form, upload the required documents, and submit the application. You can then track the status of your application online.",
-  "keywords": [
-    "apply online",
-    "revenue department",
-    "e-seba",
-    "certificate application",
-    "manipur"
-  ]
-},
-{
-  "id": "common_002",
-  "service": "Revenue Department",
-  "category": "Tracking",
-  "question": "How can I check the status of my certificate application?",
-  "answer": "After submitting your application on e-Seba Manipur, you can check the status by using the application status or tracking option available on the portal. You will be able to see whether your application is under process, approved, or rejected.",
-  "keywords": [
-    "track application",
-    "status check",
-    "e-seba",
-    "revenue department",
-    "certificate"
-  ]
-},
-
-## newly added profile FAQ
-
-{
-  "id": "profile_001",
-  "service": "General",
-  "category": "Citizen Profile",
-  "question": "What is the Citizen Profile on e-Seba Manipur?",
-  "answer": "The Citizen Profile on e-Seba Manipur stores your personal details such as name, photo, and other basic information. This profile information is automatically used to fill in your details in all service application forms, saving time and reducing errors.",
-  "keywords": [
-    "citizen profile",
-    "e-seba",
-    "profile",
-    "personal details",
-    "manipur"
-  ]
-},
-{
-  "id": "profile_002",
-  "service": "General",
-  "category": "Citizen Profile",
-  "question": "Why is my Citizen Profile information used in service application forms?",
-  "answer": "Your Citizen Profile information is automatically populated in all service application forms to make the application process faster and easier. This helps avoid repeated data entry and reduces the chance of mistakes while filling forms.",
-  "keywords": [
-    "auto fill",
-    "application form",
-    "citizen profile",
-    "e-seba",
-    "profile usage"
-  ]
-},
-{
-  "id": "profile_003",
-  "service": "General",
-  "category": "Citizen Profile",
-  "question": "Why should I keep my Citizen Profile details updated?",
-  "answer": "You should keep your Citizen Profile details updated because the same information is used in all service applications. If your profile contains incorrect or outdated information, it may cause problems or delays in processing your applications.",
-  "keywords": [
-    "update profile",
-    "correct information",
-    "citizen profile",
-    "e-seba",
-    "application issues"
-  ]
-},
-{
-  "id": "profile_004",
-  "service": "General",
-  "category": "Citizen Profile",
-  "question": "How can I edit my Citizen Profile on e-Seba Manipur?",
-  "answer": "To edit your Citizen Profile, go to the Edit Profile section, update the required details, and save the changes. The updated information will be used automatically in future service application forms.",
-  "keywords": [
-    "edit profile",
-    "update details",
-    "citizen profile",
-    "e-seba",
-    "manipur"
-  ]
-},
-{
-  "id": "profile_005",
-  "service": "General",
-  "category": "Citizen Profile",
-  "question": "How can I upload or change my profile photo?",
-  "answer": "You can upload or change your profile photo by clicking on the Upload button in the Edit Profile section and selecting a suitable image from your device. After uploading, save the changes to update your profile photo.",
-  "keywords": [
-    "upload photo",
-    "profile picture",
-    "edit profile",
-    "e-seba",
-    "citizen profile"
-  ]
-},
-{
-  "id": "profile_005b",
-  "service": "General",
-  "category": "Data Accuracy",
-  "question": "What happens if my Citizen Profile information is incorrect?",
-  "answer": "If your Citizen Profile information is incorrect, the same incorrect details may appear in your service application forms. This can lead to rejection or delay in processing your application, so it is important to keep your profile information accurate and up to date.",
-  "keywords": [
-    "wrong information",
-    "profile error",
-    "application rejection",
-    "e-seba",
-    "citizen profile"
-  ]
-},
-{
-  "id": "profile_006",
-  "service": "General",
-  "category": "Citizen Profile",
-  "question": "Do I need to fill my details again for every service application?",
-  "answer": "No, you do not need to fill your basic details again for every service application. Your Citizen Profile information is automatically populated in all service application forms.",
-  "keywords": [
-    "auto populate",
-    "application form",
-    "citizen profile",
-    "e-seba",
-    "time saving"
-  ]
-},
-
-## oken documents:
-
-
-  {
-        "id": "updating_qua_exp_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "How do I start the process of updating my Qualification and Experience in the Employment Exchange?",
-        "answer": "From the 'Apply New Services' page, locate the 'Updating Qualification, Experience' service card under the Employment Exchange Department and click 'Continue'. A verification dialog will appear prompting you to enter your Registration Number and Date of Birth to confirm your identity before proceeding.",
-        "keywords": [
-            "update qualification",
-            "update experience",
-            "employment exchange",
-            "apply new services"
-        ]
-    },
-    {
-        "id": "update_step1_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What personal information is required in Step 1 of the Update Qualification and Experience form?",
-        "answer": "Step 1 (Personal) requires you to fill in your Name as per Aadhaar, First Name, Middle Name, Last Name, Email ID, Gender, Date of Birth, Marital Status, Spouse Name (if applicable), and Mobile Number. Fields marked with an asterisk (*) are mandatory. Once completed, click 'Next' to proceed to Step 2.",
-        "keywords": [
-            "personal details"
-        ]
-    },
-    {
-        "id": "update_step1_002",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What additional personal fields are present at the bottom of Step 1?",
-        "answer": "The lower portion of Step 1 includes fields for Spouse Name, Father Name, Mother Name, Aadhaar Number, Religion, Other Religion, and Area (e.g., Urban or Rural). After filling all required fields, click the 'Next' button to advance to the Address step.",
-        "keywords": [
-            "spouse name",
-            "father name",
-            "mother name",
-            "aadhaar number",
-            "religion",
-            "area",
-            "urban",
-            "rural",
-            "next button",
-            "step 1"
-        ]
-    },
-    {
-        "id": "update_step2_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What information is needed in Step 2 (Address) of the update form?",
-        "answer": "Step 2 requires you to provide your Permanent Address details including Address, Locality, District, Pin Code, Post Office, and Police Station. For the Present Address section, you can check the box 'Is Present Address same as Permanent Address?' to auto-fill it. Click 'Next' to proceed or 'Back' to return to Step 1.",
-        "keywords": [
-            "permanent address",
-            "present address"
-        ]
-    },
-    {
-        "id": "update_step3_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What does Step 3 (Qualification) look like when no records have been added yet?",
-        "answer": "In Step 3, if no records exist, the page displays 'No Education Records – Click Add to add Education' and 'No Experience Records – Click Add to add Experience'. You must use the 'Add Education' and 'Add Experience' buttons to enter your qualification and work experience details before proceeding.",
-        "keywords": [
-            "no education records",
-            "no experience records"
-        ]
-    },
-    {
-        "id": "update_step3_addQua_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What details are required when adding a qualification in Step 3?",
-        "answer": "When you click 'Add Education', a dialog titled 'Add Qualification' appears. You need to fill in: Exam Passed, Board/University, Subjects (add using the '+' button), Division/Grade, Year of Passing (digits only), Course Duration (digits only), School/Institute Name, Medium of instruction (e.g., English, Manipuri, Hindi), and Percentage/CGPA (digits only).",
-        "keywords": [
-            "add qualification"
-        ]
-    },
-    {
-        "id": "update_step3_addExp_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What fields are available in the Add Experience dialog?",
-        "answer": "The 'Add Experience' dialog contains fields for: Name of Employer/Company/Organization, Pay on Leaving (per Month), From Date, To Date, Nature of Work, Experience Type, Type of Job, Post Held, and Reason for Leaving. A guide panel on the right provides instructions and an example to help you fill in the form correctly.",
-        "keywords": [
-            "add experience",
-            "employer"
-        ]
-    },
-    {
-        "id": "update_step3_addExp_002",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What are the accepted values for Experience Type and Type of Job when adding experience?",
-        "answer": "For Experience Type, the accepted options are: Full-Time Employment, Part-Time, Contract, and Internship. For Type of Job, the accepted options are: Administration, Technical, Skilled, Unskilled, and Office Assistance. The guide panel also notes that Nature of Work should describe your responsibilities, and you should provide a brief reason for leaving.",
-        "keywords": [
-            "experience type",
-            "reason for leaving"
-        ]
-    },
-    {
-        "id": "update_step4_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "How do I add a language in Step 4 of the update form?",
-        "answer": "In Step 4 (Language), click 'Add Language' to open the Add Language dialog. Select the language from the 'Language Known' dropdown (e.g., English), then indicate your proficiency by selecting Yes or No for Read, Speak, and Write. Click 'Add' to save the language entry or 'Cancel' to dismiss the dialog.",
-        "keywords": [
-            "add language",
-            "language known"
-        ]
-    },
-    {
-        "id": "update_step5_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What fields are in the top section of Step 5 (Other Details)?",
-        "answer": "Step 5 (Other) contains fields for: Place Where Willing to Work, Are You Employed?, Proof of Resident, Resident Proof No, Expected Minimum Salary for Outside Job (Rs. PM), Expected Minimum Salary for Local Job (Rs. PM), Priority for Central, Priority for Central Priority, Certificate Number (Central), Certifying Authority (Central), Period of Work(s) (Central), Certificate Date (Central), State Priority, and Certificate Number (State).",
-        "keywords": [
-            "other details",
-            "willing to work"
-        ]
-    },
-    {
-        "id": "update_step5_002",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What physical details are required in Step 5 of the update form?",
-        "answer": "The Physical Details section in Step 5 requires: Do Wear Glass (Yes/No), Height (in cm), Weight (in kg), Chest Normal (in cm), Chest Expanded (in cm), Disability (more than 40%), Disability Type, Main Sport, and Sport Level (e.g., International Level). All fields marked with an asterisk (*) are mandatory.",
-        "keywords": [
-            "physical details",
-            "international level"
-        ]
-    },
-    {
-        "id": "update_step5_003",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What caste and willingness information is required in Step 5?",
-        "answer": "The Caste Details section requires: Category (e.g., OBC), Caste, Sub Caste, OBC at Central List, Certificate Number, Issue Date, Issued By, and Remarks. The Willingness Details section requires: Sector Willingness (e.g., Government), Vacancy Willingness, Trade Willingness, Training Willingness, Other Willingness, Non Availability From, and Non Availability To dates.",
-        "keywords": [
-            "caste details",
-            "category",
-            "caste"
-        ]
-    },
-    {
-        "id": "update_step6_001",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What documents need to be uploaded in Step 6 (Uploads) under Identification Proof and Proof of Residence?",
-        "answer": "Step 6 (Uploads) requires you to upload the following under Identification Proof: Aadhaar Front Side, Aadhaar Back Side, and Passport Size Photograph. Under Proof of Residence, you must upload a Domicile Certificate. Successfully uploaded documents are indicated by a green checkmark icon. You can preview uploaded files using the eye icon.",
-        "keywords": [
-            "upload documents",
-            "identification proof"
-        ]
-    },
-    {
-        "id": "update_step6_002",
-        "service": "Employment Exchange",
-        "category": "Update Qualification and Experience",
-        "question": "What is required in the Declaration section before submitting the update form?",
-        "answer": "Before submitting, you must upload the remaining documents under 'Other': Caste Certificate and Date of Birth Certificate. In the Declaration section, select the 'Office in which Application needs to be processed' from the dropdown (e.g., District Employment Exchange, Imphal East), then check the declaration checkbox confirming that all information provided is true. Finally, click 'Submit' to complete the update process or 'Back' to make changes.",
-        "keywords": [
-            "declaration",
-            "caste certificate"
-        ]
-    },
-    {
-        "id": "apply_services_001",
-        "service": "General",
-        "category": "Apply New Services",
-        "question": "What services are available under the Employment Exchange Department and Revenue Department on the Apply New Services page?",
-        "answer": "The 'Apply New Services' page lists all available government services grouped by department. Under the Employment Exchange Department, the available services are: Updating Qualification & Experience, Transfer of Registration to Employment Exchange, Renewal of Registration, Application against Vacancy, and Registration in Employment Exchange. Under the Revenue Department, the available services are: OBC Certificate, Permanent Resident Certificate, Income Certificate, Domicile Certificate, ST Certificate, and SC Certificate. Services that have already been submitted show a 'Submitted' status instead of an 'Apply Now' button.",
-        "keywords": [
-            "apply new services",
-            "employment exchange department",
-            "revenue department",
-            "updating qualification",
-            "transfer of registration",
-            "renewal of registration"
-        ]
-    },
-    {
-        "id": "application_against_vacancy_001",
-        "service": "Employment Exchange",
-        "category": "Application against Vacancy",
-        "question": "How do I apply for a job vacancy through the Application against Vacancy service?",
-        "answer": "Navigate to 'Application against Vacancy' from the Apply New Services page to reach the 'Available Jobs' screen. This page displays summary cards showing your Exchange Card status, the number of Available Jobs, Applied Jobs, and Total Sponsored positions. The job listing table shows each vacancy's Job Code, Sponsor Number, Job Title, Employer, and required Qualification. Click 'Apply' to apply for a specific vacancy or 'Details' to view more information about it. You can also search for jobs by Title or Code using the search bar.",
-        "keywords": [
-            "application against vacancy",
-            "available jobs"
-        ]
-    },
-    {
-        "id": "transfer_emp_001",
-        "service": "Employment Exchange",
-        "category": "Transfer of Registration to Employment Exchange",
-        "question": "What is required in the Transfer of Employment Exchange form and how does it differ from other update forms?",
-        "answer": "The 'Transfer of Employment Exchange' form begins with a Personal section that collects the same personal details as other Employment Exchange forms: Name as per Aadhaar, First Name, Middle Name, Last Name, Email ID, Gender, Date of Birth, Marital Status, Spouse Name, Father Name, Mother Name, Aadhaar Number, Religion, and Area. The subsequent steps — Address, Qualification, Language, Other Details, and Uploads — follow the same structure and fields as the 'Update Qualification and Experience' and 'Renewal of Registration' forms.",
-        "keywords": [
-            "transfer of employment exchange",
-            "transfer registration"
-        ]
+# Content lives in data/knowledge_base.json (compiled by build_kb.py) so it
+# can ship independently of the code.
+KNOWLEDGE_BASE_PATH = os.getenv("KNOWLEDGE_BASE_PATH", kb_loader.KB_JSON_PATH)
+KNOWLEDGE_BASE = kb_loader.load_knowledge_base(KNOWLEDGE_BASE_PATH)
+
+# ─── Navigation index ────────────────────────────────────────────────────────
+
+def _lookup_key(text: str) -> str:
+    """Punctuation- and case-insensitive form used for exact question/keyword matches."""
+    return " ".join(re.findall(r"[a-z0-9]+", normalize_query(text)))
+
+def _build_direct_lookup(index: kb_index.NavigationIndex) -> dict:
+    """
+    Map each KB question, and each multi-word keyword used by only one entry,
+    to its entry. Single-word keywords ("name", "upload") are too generic to
+    stand for one answer and go through retrieval instead.
+    """
+    lookup = {}
+    keyword_owners: dict[str, list] = {}
+    for entry in index.entries.values():
+        lookup.setdefault(_lookup_key(entry.question), entry)
+        for keyword in entry.keywords:
+            keyword_owners.setdefault(_lookup_key(keyword), []).append(entry)
+    for key, owners in keyword_owners.items():
+        if " " in key and len(owners) == 1:
+            lookup.setdefault(key, owners[0])
+    return lookup
+
+_direct_lookup: dict = {}
+
+def rebuild_indexes():
+    """Rebuild the browse indexes after KNOWLEDGE_BASE has been changed."""
+    global _direct_lookup
+    kb_index.rebuild(KNOWLEDGE_BASE)
+    _direct_lookup = _build_direct_lookup(kb_index.get_index())
+    answer_cache.clear()
+
+rebuild_indexes()
+
+# ─── Session storage ─────────────────────────────────────────────────────────
+# Bounded: idle sessions expire after SESSION_IDLE_TTL seconds, the least
+# recently used are evicted beyond MAX_SESSIONS, and history keeps the last
+# MAX_SESSION_HISTORY turns. SESSION_BACKEND=sqlite shares sessions between
+# uvicorn workers through a WAL-mode SQLite file at SESSION_DB_PATH.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(os.path.dirname(__file__), "sessions.db"))
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "0.05"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "50000"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+MAX_SESSION_HISTORY = int(os.getenv("MAX_SESSION_HISTORY", "50"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+sessions = session_store.create_store(
+    SESSION_BACKEND,
+    path=SESSION_DB_PATH,
+    flush_interval=SESSION_FLUSH_INTERVAL,
+    max_sessions=MAX_SESSIONS,
+    idle_ttl=SESSION_IDLE_TTL,
+    max_history=MAX_SESSION_HISTORY,
+)
+metrics.REGISTRY.register(metrics.Gauge(
+    "eseba_live_sessions",
+    "Sessions currently held by the session store.",
+    callback=lambda: sessions.stats()["live_sessions"],
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "eseba_session_bytes",
+    "Approximate size of the sessions held by the session store, in bytes.",
+    callback=lambda: sessions.stats()["approx_bytes"],
+))
+
+def _cache_lookups() -> dict:
+    embed = knowledge_store.embed_cache_stats()
+    answers = answer_cache.stats()
+    return {
+        ("embedding", "hit"): embed["hits"],
+        ("embedding", "miss"): embed["misses"],
+        ("answer", "hit"): answers["hits"],
+        # A near-duplicate hit is an exact-key miss that was then served
+        ("answer", "near_hit"): answers["near_hits"],
+        ("answer", "miss"): answers["misses"] - answers["near_hits"],
     }
 
-
-
-
-
-
-]
-# ─── In-memory session storage ───────────────────────────────────────────────
-sessions: dict = {}
+metrics.REGISTRY.register(metrics.Counter(
+    "eseba_cache_lookups_total",
+    "Query-embedding and AI answer cache lookups by result (hit, near_hit, miss).",
+    ["cache", "result"],
+    callback=_cache_lookups,
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "eseba_cache_entries",
+    "Entries held by the query-embedding and AI answer caches.",
+    ["cache"],
+    callback=lambda: {
+        ("embedding",): knowledge_store.embed_cache_stats()["size"],
+        ("answer",): answer_cache.stats()["size"],
+    },
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "eseba_upstream_active",
+    "Gemini-backed operations currently holding an admission slot.",
+    callback=lambda: upstream_gate.active,
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "eseba_upstream_waiting",
+    "Requests queued for an admission slot.",
+    callback=lambda: upstream_gate.waiting,
+))
+metrics.REGISTRY.register(metrics.Gauge(
+    "eseba_index_ready",
+    "1 once the retrieval index is loaded, 0 while warming up or after a failed load.",
+    callback=lambda: int(knowledge_store.is_ready()),
+))
 
 # ─── Helper functions ─────────────────────────────────────────────────────────
 
 def get_services():
-    services = list(set(item["service"] for item in KNOWLEDGE_BASE))
-    return sorted(services)
+    return list(kb_index.get_index().services)
 
 def get_categories_for_service(service: str):
-    cats = list(set(item["category"] for item in KNOWLEDGE_BASE if item["service"] == service and item["category"] != "Overview"))
-    return sorted(cats)
+    return list(kb_index.get_index().categories.get(service, ()))
 
 def get_questions_for_category(service: str, category: str):
-    return [
-        {"id": item["id"], "question": item["question"]}
-        for item in KNOWLEDGE_BASE
-        if item["service"] == service and item["category"] == category
-    ]
+    return list(kb_index.get_index().questions.get((service, category), ()))
 
 def get_answer(question_id: str):
-    for item in KNOWLEDGE_BASE:
-        if item["id"] == question_id:
-            return item
-    return None
+    return kb_index.get_index().entries.get(question_id)
 
 def get_service_overview(service: str):
     """Return the overview answer for a service (entry whose id ends with '000')."""
-    for item in KNOWLEDGE_BASE:
-        if item["service"] == service and item["id"].endswith("000"):
-            return item["answer"]
-    return None
+    return kb_index.get_index().overviews.get(service)
 
 # ─── Pydantic Models ──────────────────────────────────────────────────────────
 
@@ -1398,6 +368,10 @@ class AIChatRequest(BaseModel):
     session_id: str
     message: str
 
+class BatchRetrieveRequest(BaseModel):
+    queries: list[str]
+    n_results: int = 5
+
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
 @app.post("/api/session/start")
@@ -1414,14 +388,14 @@ def start_session(data: SessionCreate):
 
     import uuid
     session_id = str(uuid.uuid4())
-    sessions[session_id] = {
+    sessions.create(session_id, {
         "user": {"name": name, "phone": phone},
         "created_at": datetime.now().isoformat(),
         "history": [],
         "state": "service_selection",
         "current_service": None,
         "current_category": None,
-    }
+    })
 
     return {
         "session_id": session_id,
@@ -1430,15 +404,33 @@ def start_session(data: SessionCreate):
         "services": get_services(),
     }
 
+def _with_timing(payload: dict, debug: bool, **details) -> dict:
+    """
+    Mark the handler as done and, with ?debug=true, attach this request's
+    stage timings (plus any `details`) as a `timing` field.
+    """
+    tracing.mark_handler_done()
+    trace = tracing.current()
+    if debug and trace is not None:
+        payload["timing"] = {"request_id": trace.request_id, "stages_ms": trace.as_dict(), **details}
+    return payload
+
 @app.post("/api/chat")
-def chat(req: ChatRequest):
-    if req.session_id not in sessions:
+def chat(req: ChatRequest, debug: bool = False):
+    with tracing.span("session"):
+        session = sessions.get(req.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found. Please start a new session.")
+    _check_rate(browse_rate_limit, req.session_id, session)
+
+    with tracing.span("browse"):
+        response = _chat_step(session, req.action, req.value)
+    with tracing.span("session"):
+        sessions.save(req.session_id, session)
+    return _with_timing(response, debug)
 
-    session = sessions[req.session_id]
-    user_name = session["user"]["name"]
-    action = req.action
-    value = req.value
+def _chat_step(session: dict, action: str, value: Optional[str]) -> dict:
+    """Apply one browse action to the session and build the response."""
 
     # ── Handle BACK ──────────────────────────────────────────────────────────
     if action == "back":
@@ -1483,7 +475,7 @@ def chat(req: ChatRequest):
 
     # ── Select Service ────────────────────────────────────────────────────────
     if action == "select_service":
-        if value not in get_services():
+        if value not in kb_index.get_index().service_set:
             raise HTTPException(status_code=400, detail="Invalid service selected.")
         session["current_service"] = value
         session["current_category"] = None
@@ -1504,7 +496,7 @@ def chat(req: ChatRequest):
     if action == "select_category":
         if not session["current_service"]:
             raise HTTPException(status_code=400, detail="No service selected.")
-        valid_cats = get_categories_for_service(session["current_service"])
+        valid_cats = kb_index.get_index().category_sets.get(session["current_service"], frozenset())
         if value not in valid_cats:
             raise HTTPException(status_code=400, detail="Invalid category.")
         session["current_category"] = value
@@ -1526,60 +518,22 @@ def chat(req: ChatRequest):
         session["state"] = "answer"
         session["history"].append({
             "question_id": value,
-            "question": item["question"],
+            "question": item.question,
             "timestamp": datetime.now().isoformat(),
         })
         return {
             "state": "answer",
-            "message": item["answer"],
-            "question": item["question"],
-            "service": item["service"],
-            "category": item["category"],
+            "message": item.answer,
+            "question": item.question,
+            "service": item.service,
+            "category": item.category,
         }
 
     raise HTTPException(status_code=400, detail="Unknown action.")
 
 # ─── AI Chat Endpoint ─────────────────────────────────────────────────────────
 
-@app.post("/api/ai-chat")
-def ai_chat(req: AIChatRequest):
-    """Free-text AI chat using ChromaDB retrieval + Gemini LLM generation."""
-    if req.session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found. Please start a new session.")
-
-    session = sessions[req.session_id]
-    user_message = req.message.strip() 
-    user_message = normalize_query(user_message)
-    if not user_message:
-        raise HTTPException(status_code=400, detail="Message cannot be empty.")
-
-    # 1. Retrieve relevant knowledge from ChromaDB
-    try:
-        matches = knowledge_store.query(user_message, n_results=5)
-    except Exception as e:
-        print(f"ChromaDB query error: {e}")
-        matches = []
-
-    # 2. Build context from retrieved entries
-    context_parts = []
-    sources = []
-    for m in matches:
-        if m["score"] > 0.5:  # Only include reasonably relevant matches
-            context_parts.append(
-                f"Q: {m['question']}\nA: {m['answer']}\n(Service: {m['service']}, Category: {m['category']})"
-            )
-            sources.append({
-                "id": m["id"],
-                "question": m["question"],
-                "service": m["service"],
-                "category": m["category"],
-                "score": m["score"],
-            })
-
-    context_text = "\n\n---\n\n".join(context_parts) if context_parts else ""
-
-    # 3. Generate answer with Gemini LLM
-    system_prompt = """You are the official e-Seba Manipur Help Assistant — a helpful and knowledgeable guide for citizens using the Government of Manipur's e-Seba portal (eseba.manipur.gov.in).
+SYSTEM_PROMPT = """You are the official e-Seba Manipur Help Assistant — a helpful and knowledgeable guide for citizens using the Government of Manipur's e-Seba portal (eseba.manipur.gov.in).
 
 TONE:
 - Professional, clear, and helpful.
@@ -1604,63 +558,427 @@ WHEN INFORMATION IS LIMITED OR MISSING:
 - Give whatever general guidance you can about e-Seba Manipur services, then suggest they browse specific service categories or contact support.
 - Always leave the user with a next step."""
 
-    if context_text:
-        user_prompt = f"""Here is some helpful reference information:
+system_prompt_cache = PromptCache(GEMINI_MODEL, SYSTEM_PROMPT, ttl=PROMPT_CACHE_TTL)
 
-{context_text}
+AI_ERROR_ANSWER = "Sorry, something went wrong while processing your request. Please try again, or use the Browse Topics tab to find what you need. 🙏"
+AI_INTERRUPTED_ANSWER = "The answer was cut off because something went wrong. Please try again, or use the Browse Topics tab to find what you need."
 
----
 
-The citizen is asking: {user_message}
+async def _get_ai_session(req: AIChatRequest) -> str:
+    """Validate and rate-limit an AI chat request; returns the normalised message."""
+    with tracing.span("session"):
+        session = await sessions.aget(req.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found. Please start a new session.")
 
-Answer their question directly and helpfully. Remember — speak confidently as if you naturally know this, never mention where the information comes from."""
-    else:
-        user_prompt = f"""The citizen is asking: {user_message}
+    with tracing.span("normalize"):
+        user_message = req.message.strip()
+        user_message = normalize_query(user_message)
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty.")
+    _check_rate(ai_rate_limit, req.session_id, session)
+    return user_message
 
-You may not have specific details for this exact question, but do your best to help. Give general guidance about e-Seba Manipur services and suggest what they can explore. Never say you have no information — always be helpful and guide them forward."""
 
+async def _retrieve_context(user_message: str) -> dict:
+    """Retrieve relevant KB entries and build the prompt context, sources and suggestions."""
+    # 1. Retrieve relevant knowledge from ChromaDB
+    # The query embedding (None if the vector leg had none) also keys the
+    # answer cache; it is never re-requested here, so a failing or not yet
+    # ready index costs no extra embedding call
     try:
-        client = _get_gemini_client()
-        response = client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=user_prompt,
-            config=genai.types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=0.4,
-                max_output_tokens=1024,
-            ),
-        )
-        ai_answer = response.text
+        matches, query_embedding = await knowledge_store.aquery_with_embedding(user_message, n_results=5)
     except Exception as e:
-        print(f"Gemini LLM error: {e}")
-        ai_answer = "Sorry, something went wrong while processing your request. Please try again, or use the Browse Topics tab to find what you need. 🙏"
+        tracing.log(f"ChromaDB query error: {e}")
+        metrics.ERRORS.inc(component="retrieval")
+        matches, query_embedding = [], None
+
+    scores = [m["score"] for m in matches if m["score"] is not None]
+    if scores:
+        metrics.RETRIEVAL_SCORE.observe(max(scores))
+
+    # 2. Build a token-budgeted context from the relevant entries; lexical-only
+    # matches (vector leg unavailable) have no similarity score and are kept as ranked
+    context = context_builder.build_context(
+        matches,
+        user_message,
+        token_budget=CONTEXT_TOKEN_BUDGET,
+        passage_tokens=CONTEXT_PASSAGE_TOKENS,
+        min_score=CONTEXT_MIN_SCORE,
+        dedupe_similarity=CONTEXT_DEDUPE_SIMILARITY,
+    )
+    metrics.CONTEXT_TOKENS.observe(context["tokens"])
+    sources = [
+        {
+            "id": m["id"],
+            "question": m["question"],
+            "service": m["service"],
+            "category": m["category"],
+            "score": m["score"],
+        }
+        for m in context["matches"]
+    ]
+
+    # 3. Build suggestion chips from top sources
+    suggestions = _build_suggestions(sources)
+
+    return {
+        "context_text": context["text"],
+        "context_tokens": context["tokens"],
+        "sources": sources,
+        "source_ids": [src["id"] for src in sources],
+        "suggestions": suggestions,
+        "query_embedding": query_embedding,
+        "direct_answer": None,
+    }
 
-    # 4. Build suggestion chips from top sources
+
+def _build_suggestions(sources: list[dict]) -> list[dict]:
     suggestions = []
     seen_services = set()
     for s in sources[:3]:
         if s["service"] not in seen_services:
             suggestions.append({"service": s["service"], "category": s["category"]})
             seen_services.add(s["service"])
+    return suggestions
+
+
+async def _answer_context(user_message: str) -> dict:
+    """
+    Like _retrieve_context(), but sets `direct_answer` to a curated KB answer
+    when it can be served without generation: the message exactly matches a
+    KB question or unique multi-word keyword, or the best retrieved match scores at
+    least DIRECT_ANSWER_SCORE.
+    """
+    entry = DIRECT_ANSWERS and _direct_lookup.get(_lookup_key(user_message))
+    if entry:
+        source = {
+            "id": entry.id,
+            "question": entry.question,
+            "service": entry.service,
+            "category": entry.category,
+            "score": 1.0,
+        }
+        return {
+            "context_text": "",
+            "context_tokens": 0,
+            "sources": [source],
+            "source_ids": [entry.id],
+            "suggestions": _build_suggestions([source]),
+            "query_embedding": None,
+            "direct_answer": entry.answer,
+        }
 
-    # 5. Log to session history
-    session["history"].append({
-        "type": "ai_chat",
-        "user_message": user_message,
-        "timestamp": datetime.now().isoformat(),
-    })
+    ctx = await _retrieve_context(user_message)
+    if DIRECT_ANSWERS:
+        scored = [src for src in ctx["sources"] if src["score"] is not None]
+        best = max(scored, key=lambda src: src["score"], default=None)
+        if best is not None and best["score"] >= DIRECT_ANSWER_SCORE:
+            entry = get_answer(best["id"])
+            if entry is not None:
+                ctx["direct_answer"] = entry.answer
+    return ctx
 
-    return {
+
+def _build_user_prompt(user_message: str, context_text: str) -> str:
+    if context_text:
+        return f"""Here is some helpful reference information:
+
+{context_text}
+
+---
+
+The citizen is asking: {user_message}
+
+Answer their question directly and helpfully. Remember — speak confidently as if you naturally know this, never mention where the information comes from."""
+    return f"""The citizen is asking: {user_message}
+
+You may not have specific details for this exact question, but do your best to help. Give general guidance about e-Seba Manipur services and suggest what they can explore. Never say you have no information — always be helpful and guide them forward."""
+
+
+def _generation_config(cached_content: Optional[str] = None) -> genai.types.GenerateContentConfig:
+    """Generation settings; the system prompt goes by cache reference when one is given."""
+    if cached_content:
+        return genai.types.GenerateContentConfig(
+            cached_content=cached_content,
+            temperature=0.4,
+            max_output_tokens=1024,
+        )
+    return genai.types.GenerateContentConfig(
+        system_instruction=SYSTEM_PROMPT,
+        temperature=0.4,
+        max_output_tokens=1024,
+    )
+
+
+def _is_cache_error(error: Exception) -> bool:
+    """
+    True for errors that mean the referenced context cache is gone or unusable:
+    403/404, or any error naming the cached content. Other 400s are ordinary
+    request errors and are not retried.
+    """
+    return getattr(error, "code", None) in (403, 404) or "cachedcontent" in str(error).lower().replace("_", "")
+
+
+async def _prepend(first, chunks):
+    """Re-attach an already received first chunk to the rest of a stream."""
+    if first is not None:
+        yield first
+    async for chunk in chunks:
+        yield chunk
+
+
+async def _start_generation(prompt: str, stream: bool = False):
+    """
+    Call Gemini (generate_content, or generate_content_stream if `stream`),
+    referencing the cached system prompt when one is live. If the cache
+    reference is rejected, drop the cache and retry once with the prompt inline.
+    """
+    client = gemini_client.get_client()
+
+    async def generate(config):
+        if not stream:
+            return await client.aio.models.generate_content(model=GEMINI_MODEL, contents=prompt, config=config)
+        # The stream sends its request on the first iteration, so take the first
+        # chunk here, where a rejected cache reference can still be retried
+        chunks = await client.aio.models.generate_content_stream(model=GEMINI_MODEL, contents=prompt, config=config)
+        return _prepend(await anext(chunks, None), chunks)
+
+    cache_name = system_prompt_cache.current() if PROMPT_CACHE else None
+    if cache_name:
+        try:
+            return await generate(_generation_config(cache_name))
+        except Exception as e:
+            if not _is_cache_error(e):
+                raise
+            tracing.log(f"⚠️ Cached system prompt {cache_name} rejected, sending it inline: {e}")
+            system_prompt_cache.invalidate()
+    return await generate(_generation_config())
+
+
+async def _log_ai_turn(session_id: str, user_message: str) -> None:
+    # Appended to the stored session rather than saving the copy read at the
+    # start of the request, which would undo browse steps taken meanwhile
+    with tracing.span("session"):
+        await sessions.aappend_history(session_id, {
+            "type": "ai_chat",
+            "user_message": user_message,
+            "timestamp": datetime.now().isoformat(),
+        })
+
+
+def _flight_key(user_message: str):
+    """Coalescing key: the normalised message, or a unique key when coalescing is off."""
+    return " ".join(user_message.split()) if COALESCE_REQUESTS else object()
+
+
+def _upstream_slot(user_message: str):
+    """Admission slot for computing an answer; exact KB matches need no upstream call."""
+    if DIRECT_ANSWERS and _lookup_key(user_message) in _direct_lookup:
+        return nullcontext()
+    return upstream_gate.slot(admission.CHAT)
+
+
+async def _produce_answer(user_message: str, flight, stream: bool) -> None:
+    """
+    Compute one AI answer and publish it to `flight`: ("context", ctx), then
+    ("chunk", text) items (one per streamed chunk when `stream`), then
+    ("done", {"cached", "direct", "outcome", "error"}), where `error` is a
+    message for the user when generation failed after some chunks were
+    published (None otherwise). Runs once per group of
+    identical in-flight requests (see answer_flights), holding an upstream
+    admission slot unless the message is an exact KB match; Overloaded is
+    raised before anything is published.
+    """
+    async with _upstream_slot(user_message):
+        with tracing.span("retrieve"):
+            ctx = await _answer_context(user_message)
+        flight.publish(("context", ctx))
+
+        # Serve confident matches verbatim, else from the answer cache when this
+        # question was answered recently
+        direct = ctx["direct_answer"] is not None
+        if direct:
+            ai_answer, cached = ctx["direct_answer"], False
+        else:
+            ai_answer = answer_cache.get(user_message, ctx["source_ids"], ctx["query_embedding"])
+            cached = ai_answer is not None
+        outcome = "direct" if direct else "cached" if cached else "generated"
+        error = None
+
+        if ai_answer is not None:
+            flight.publish(("chunk", ai_answer))
+        else:
+            # Generate answer with Gemini LLM
+            parts = []
+            try:
+                with metrics.track_stage("prompt_build"):
+                    prompt = _build_user_prompt(user_message, ctx["context_text"])
+                with metrics.track_stage("generation"):
+                    if stream:
+                        usage = None
+                        response = await _start_generation(prompt, stream=True)
+                        async for chunk in response:
+                            usage = chunk.usage_metadata or usage
+                            if chunk.text:
+                                parts.append(chunk.text)
+                                flight.publish(("chunk", chunk.text))
+                    else:
+                        response = await _start_generation(prompt)
+                        usage = response.usage_metadata
+                        if response.text:
+                            parts.append(response.text)
+                            flight.publish(("chunk", response.text))
+                metrics.record_usage(usage)
+                if parts:
+                    answer_cache.set(user_message, ctx["source_ids"], "".join(parts), ctx["query_embedding"])
+            except Exception as e:
+                tracing.log(f"Gemini LLM error: {e}")
+                outcome = "error"
+                if parts:
+                    error = AI_INTERRUPTED_ANSWER
+                else:
+                    flight.publish(("chunk", AI_ERROR_ANSWER))
+
+        flight.publish(("done", {"cached": cached, "direct": direct, "outcome": outcome, "error": error}))
+
+
+async def _collect_answer(flight) -> tuple[dict, str, dict]:
+    """Wait for a flight to finish; returns (context, answer text, done flags)."""
+    ctx, parts, result = None, [], {}
+    async for kind, data in flight.subscribe():
+        if kind == "context":
+            ctx = data
+        elif kind == "chunk":
+            parts.append(data)
+        else:
+            result = data
+    return ctx, "".join(parts), result
+
+
+@app.post("/api/ai-chat")
+async def ai_chat(req: AIChatRequest, debug: bool = False):
+    """Free-text AI chat using ChromaDB retrieval + Gemini LLM generation."""
+    user_message = await _get_ai_session(req)
+    flight, leader = answer_flights.join(
+        _flight_key(user_message), lambda f: _produce_answer(user_message, f, stream=False)
+    )
+    if leader:
+        ctx, ai_answer, result = await _collect_answer(flight)
+    else:
+        metrics.COALESCED.inc(endpoint="ai_chat")
+        with tracing.span("coalesced"):
+            ctx, ai_answer, result = await _collect_answer(flight)
+    metrics.AI_ANSWERS.inc(endpoint="ai_chat", outcome=result["outcome"])
+
+    await _log_ai_turn(req.session_id, user_message)
+
+    return _with_timing({
         "answer": ai_answer,
-        "sources": sources,
-        "suggestions": suggestions,
+        "sources": ctx["sources"],
+        "suggestions": ctx["suggestions"],
+        "cached": result["cached"],
+        "direct": result["direct"],
+    }, debug, context_tokens=ctx["context_tokens"], coalesced=not leader)
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/ai-chat/stream")
+async def ai_chat_stream(req: AIChatRequest, debug: bool = False):
+    """
+    Streaming variant of /api/ai-chat as Server-Sent Events:
+    `sources` (sources + suggestions), then `chunk` events with answer text,
+    then `done` (with the `cached` and `direct` flags, the `outcome`, an
+    `error` message when generation failed part-way and the chunks sent are
+    an incomplete answer, and with ?debug=true the full stage timings, which
+    the Server-Timing header cannot include).
+    Identical concurrent requests share one generation and see the same chunks.
+    """
+    user_message = await _get_ai_session(req)
+    flight, leader = answer_flights.join(
+        _flight_key(user_message), lambda f: _produce_answer(user_message, f, stream=True)
+    )
+    if not leader:
+        metrics.COALESCED.inc(endpoint="ai_chat_stream")
+    # Wait for admission before committing to a streamed 200, so an
+    # overloaded request still gets a plain 503 with Retry-After
+    await flight.wait_first()
+    trace = tracing.current()
+
+    async def events():
+        ctx = None
+        async for kind, data in flight.subscribe():
+            if kind == "context":
+                ctx = data
+                yield _sse("sources", {"sources": ctx["sources"], "suggestions": ctx["suggestions"]})
+            elif kind == "chunk":
+                yield _sse("chunk", {"text": data})
+            else:
+                metrics.AI_ANSWERS.inc(endpoint="ai_chat_stream", outcome=data["outcome"])
+                await _log_ai_turn(req.session_id, user_message)
+                done = {key: data[key] for key in ("cached", "direct", "outcome", "error")}
+                if debug and trace is not None:
+                    done["timing"] = {
+                        "request_id": trace.request_id,
+                        "stages_ms": trace.as_dict(),
+                        "context_tokens": ctx["context_tokens"],
+                        "coalesced": not leader,
+                    }
+                yield _sse("done", done)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ─── Bulk Retrieval Endpoint ──────────────────────────────────────────────────
+
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "2000"))
+
+@app.post("/api/retrieve/batch")
+async def retrieve_batch(req: BatchRetrieveRequest):
+    """Retrieve KB matches for many queries at once (evaluation sweeps, cache warm-up)."""
+    if not req.queries:
+        raise HTTPException(status_code=400, detail="No queries given.")
+    if len(req.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUERIES} queries per request.")
+    if not 1 <= req.n_results <= 20:
+        raise HTTPException(status_code=400, detail="n_results must be between 1 and 20.")
+
+    queries = [normalize_query(q.strip()) for q in req.queries]
+    if not all(queries):
+        raise HTTPException(status_code=400, detail="Queries cannot be empty.")
+
+    async with upstream_gate.slot(admission.BULK):
+        try:
+            results = await knowledge_store.aquery_many(queries, n_results=req.n_results)
+        except Exception as e:
+            tracing.log(f"Batch retrieval error: {e}")
+            raise HTTPException(status_code=503, detail="Retrieval is temporarily unavailable.")
+
+    return {
+        "results": [
+            {
+                "query": query,
+                "matches": [
+                    {key: m[key] for key in ("id", "question", "service", "category", "score")}
+                    for m in matches
+                ],
+            }
+            for query, matches in zip(queries, results)
+        ]
     }
 
 @app.get("/api/session/{session_id}")
 def get_session(session_id: str):
-    if session_id not in sessions:
+    s = sessions.get(session_id)
+    if s is None:
         raise HTTPException(status_code=404, detail="Session not found.")
-    s = sessions[session_id]
     return {
         "user": s["user"],
         "state": s["state"],
@@ -1671,17 +989,46 @@ def get_session(session_id: str):
 
 @app.get("/api/services")
 def list_services():
-    services = get_services()
-    result = []
-    for svc in services:
-        cats = get_categories_for_service(svc)
-        count = sum(1 for item in KNOWLEDGE_BASE if item["service"] == svc)
-        result.append({"service": svc, "categories": cats, "question_count": count})
-    return result
+    index = kb_index.get_index()
+    return [
+        {
+            "service": svc,
+            "categories": list(index.categories[svc]),
+            "question_count": index.question_counts[svc],
+        }
+        for svc in index.services
+    ]
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "e-Seba Manipur Chatbot API"}
+    return {
+        "status": "ok",
+        "service": "e-Seba Manipur Chatbot API",
+        "sessions": sessions.stats(),
+        "caches": {
+            "embeddings": knowledge_store.embed_cache_stats(),
+            "answers": answer_cache.stats(),
+        },
+        "prompt_cache": system_prompt_cache.stats() if PROMPT_CACHE else None,
+        "coalescing": answer_flights.stats() if COALESCE_REQUESTS else None,
+        "admission": {
+            "upstream": upstream_gate.stats(),
+            "ai_rate_limit": ai_rate_limit.stats() if ai_rate_limit else None,
+            "browse_rate_limit": browse_rate_limit.stats() if browse_rate_limit else None,
+        },
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape endpoint: per-stage latency, request counts, scores, tokens and errors."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the retrieval index is loaded, 503 while warming up."""
+    index = knowledge_store.status()
+    ready = index["state"] == "ready"
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "index": index})
 
 # Serve frontend
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -0,0 +1,311 @@
+"""
+Metrics — a small, dependency-free Prometheus registry (counters, gauges
+and histograms rendered in the text exposition format) plus the metrics the
+chatbot records: per-stage latency of the RAG pipeline, request counts per
+route and outcome, retrieval scores, LLM token counts and errors.
+
+Metrics are per process; with several uvicorn workers, scrape each worker
+(or run one worker per container) and aggregate in Prometheus.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+import tracing
+
+# Latency buckets in seconds, from sub-millisecond index lookups to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SCORE_BUCKETS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def _callback_samples(self, callback: Callable) -> list[str]:
+        """
+        Series read at scrape time: `callback` returns one value, or a dict of
+        label-value tuples to values for a labelled metric.
+        """
+        try:
+            value = callback()
+        except Exception:
+            return []
+        if not isinstance(value, dict):
+            return [f"{self.name} {_format_value(value)}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, tuple(map(str, key)))} {_format_value(v)}"
+            for key, v in sorted(value.items())
+        ]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, one series per label combination;
+    incremented here, or read from `callback` at scrape time.
+    """
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        callback: Optional[Callable[[], "float | dict"]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        if self.callback is not None:
+            return self._callback_samples(self.callback)
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Current value, either set explicitly or read from `callback` at scrape time (see Counter)."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        callback: Optional[Callable[[], "float | dict"]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> list[str]:
+        if self.callback is not None:
+            return self._callback_samples(self.callback)
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with _bucket, _sum and _count series."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the `with` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ─── Chatbot metrics ─────────────────────────────────────────────────────────
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "eseba_stage_duration_seconds",
+    "Time spent in each RAG pipeline stage (embed, vector_query, lexical_query, prompt_build, generation).",
+    ["stage"],
+))
+REQUESTS = REGISTRY.register(Counter(
+    "eseba_http_requests_total",
+    "HTTP requests by route template, method and status code.",
+    ["route", "method", "status"],
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "eseba_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["route"],
+))
+AI_ANSWERS = REGISTRY.register(Counter(
+    "eseba_ai_answers_total",
+    "AI chat answers by endpoint and how they were produced (direct, cached, generated, error).",
+    ["endpoint", "outcome"],
+))
+RETRIEVAL_SCORE = REGISTRY.register(Histogram(
+    "eseba_retrieval_score",
+    "Similarity score of the best retrieved KB match per AI chat query.",
+    buckets=SCORE_BUCKETS,
+))
+LLM_TOKENS = REGISTRY.register(Histogram(
+    "eseba_llm_tokens",
+    "LLM tokens per generation call, by kind (prompt, cached part of the prompt, output).",
+    ["kind"],
+    buckets=TOKEN_BUCKETS,
+))
+CONTEXT_TOKENS = REGISTRY.register(Histogram(
+    "eseba_context_tokens",
+    "Estimated tokens of retrieved context packed into each generation prompt.",
+    buckets=TOKEN_BUCKETS,
+))
+ERRORS = REGISTRY.register(Counter(
+    "eseba_errors_total",
+    "Errors by component (a pipeline stage, or retrieval/generation as seen by the API).",
+    ["component"],
+))
+COALESCED = REGISTRY.register(Counter(
+    "eseba_coalesced_requests_total",
+    "AI chat requests served by joining an identical in-flight request instead of computing their own answer.",
+    ["endpoint"],
+))
+SHED = REGISTRY.register(Counter(
+    "eseba_shed_requests_total",
+    "Requests rejected by admission control, by reason (rate_limit, queue_full, queue_timeout).",
+    ["reason"],
+))
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time one pipeline stage into STAGE_SECONDS and the current request's
+    trace; an exception also counts as an error of that stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(component=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        tracing.record(stage, elapsed)
+
+
+def record_usage(usage) -> None:
+    """Record prompt/output token counts from a Gemini `usage_metadata` object."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_token_count", None)
+    cached = getattr(usage, "cached_content_token_count", None)
+    output = getattr(usage, "candidates_token_count", None)
+    if prompt:
+        LLM_TOKENS.observe(prompt, kind="prompt")
+    if cached:
+        LLM_TOKENS.observe(cached, kind="cached")
+    if output:
+        LLM_TOKENS.observe(output, kind="output")
@@ -0,0 +1,145 @@
+"""
+Prompt Cache — registers the static system prompt once with Gemini's
+explicit context-cache API, so generation requests reference it by name
+instead of resending (and re-prefilling) it every time.
+
+A background task creates the cache at startup and extends its TTL before
+it expires. Requests only read the current cache name (no network); when
+there is none — creation failed, the prompt is below the model's minimum
+cacheable size, or the cache was lost — callers send the prompt inline.
+A rejected request (e.g. a prompt under the minimum size) will not succeed
+on retry, so it disables the cache for the life of the process.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from google import genai
+
+import gemini_client
+
+
+class PromptCache:
+    """One explicit Gemini context cache holding a system instruction."""
+
+    def __init__(
+        self,
+        model: str,
+        system_instruction: str,
+        ttl: float = 3600.0,
+        refresh_margin: float = 300.0,
+        retry_interval: float = 600.0,
+        display_name: str = "eseba-system-prompt",
+    ):
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.retry_interval = retry_interval
+        self.display_name = display_name
+        self._name: Optional[str] = None
+        self._expires_at = 0.0  # monotonic; conservative (taken before the API call)
+        self._last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.disabled = False
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+
+    def current(self) -> Optional[str]:
+        """Name of the live cache, or None if prompts must be sent inline."""
+        if self._name is not None and time.monotonic() < self._expires_at:
+            return self._name
+        return None
+
+    def invalidate(self) -> None:
+        """Forget the cache (e.g. a request using it failed); the refresher recreates it."""
+        self._name = None
+        self._expires_at = 0.0
+        self._wake.set()
+
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        """True when the API rejected the request itself, rather than failing transiently."""
+        return getattr(error, "code", None) == 400 or "INVALID_ARGUMENT" in str(error)
+
+    def _ttl(self) -> str:
+        return f"{int(self.ttl)}s"
+
+    async def ensure(self) -> Optional[str]:
+        """Create the cache, or extend it if it expires within refresh_margin. Never raises."""
+        async with self._lock:
+            if self.disabled:
+                return None
+            now = time.monotonic()
+            if self._name is not None and now < self._expires_at - self.refresh_margin:
+                return self._name
+            if self._name is None and self._last_failure is not None and now - self._last_failure < self.retry_interval:
+                return None
+
+            try:
+                caches = gemini_client.get_client().aio.caches
+                if self._name is not None:
+                    try:
+                        await caches.update(name=self._name, config=genai.types.UpdateCachedContentConfig(ttl=self._ttl()))
+                        self._expires_at = now + self.ttl
+                        return self._name
+                    except Exception as e:
+                        # Expired or deleted upstream: fall through and recreate
+                        print(f"⚠️ Could not extend prompt cache {self._name}: {e}")
+                        self.invalidate()
+
+                cached = await caches.create(
+                    model=self.model,
+                    config=genai.types.CreateCachedContentConfig(
+                        system_instruction=self.system_instruction,
+                        display_name=self.display_name,
+                        ttl=self._ttl(),
+                    ),
+                )
+            except Exception as e:
+                self._last_failure = now
+                self.last_error = str(e)
+                if self._is_permanent(e):
+                    self.disabled = True
+                    print(f"ℹ️ Prompt caching disabled, sending the system prompt inline: {e}")
+                else:
+                    print(f"ℹ️ Prompt caching unavailable, sending the system prompt inline: {e}")
+                return None
+
+            self._name, self._expires_at = cached.name, now + self.ttl
+            self._last_failure, self.last_error = None, None
+            print(f"🗄️ Cached the system prompt as {cached.name} (TTL {self._ttl()}).")
+            return self._name
+
+    async def run(self) -> None:
+        """Keep the cache alive; run as a background task until cancelled."""
+        while not self.disabled:
+            await self.ensure()
+            if self.current() is not None:
+                wait = self._expires_at - self.refresh_margin - time.monotonic()
+            else:
+                wait = self.retry_interval
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(1.0, wait))
+            except asyncio.TimeoutError:
+                pass
+
+    async def aclose(self) -> None:
+        """Delete the cache so it stops accruing storage cost. Never raises."""
+        name, self._name = self._name, None
+        if name is None:
+            return
+        try:
+            await gemini_client.get_client().aio.caches.delete(name=name)
+        except Exception as e:
+            print(f"⚠️ Could not delete prompt cache {name}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "active": self.current() is not None,
+            "name": self.current(),
+            "disabled": self.disabled,
+            "last_error": self.last_error,
+        }
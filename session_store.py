@@ -0,0 +1,416 @@
+"""
+Session Store — bounded chat sessions with idle-TTL expiry, an absolute
+session cap with LRU eviction, a per-session history cap and a background
+sweeper, so memory stays flat however long a worker runs.
+
+Two backends share one interface: InMemorySessionStore (default, single
+process) and SQLiteSessionStore (a WAL-mode SQLite file shared by every
+uvicorn worker / replica on the host).
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+
+def _to_json(session: dict) -> bytes:
+    return json.dumps(session, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _estimate_bytes(session: dict) -> int:
+    """Rough in-memory footprint of a session, from its compact JSON size."""
+    return len(_to_json(session))
+
+
+class SessionStore:
+    """
+    Interface for session backends. Sessions are plain JSON-serialisable
+    dicts; callers get() a session, mutate it, then save() it back.
+    """
+
+    def __init__(self, max_sessions: int = 50_000, idle_ttl: float = 3600.0, max_history: int = 50):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_history = max_history
+        self.evicted = 0
+        self.expired = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def _trim_history(self, session: dict) -> None:
+        history = session.get("history")
+        if history is not None and len(history) > self.max_history:
+            del history[: len(history) - self.max_history]
+
+    def create(self, session_id: str, session: dict) -> None:
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Return the session (marking it as used), or None if unknown or idle too long."""
+        raise NotImplementedError
+
+    def save(self, session_id: str, session: dict) -> None:
+        """Record changes made to a session, trimming its history to the cap."""
+        raise NotImplementedError
+
+    async def aget(self, session_id: str) -> Optional[dict]:
+        """get() for async callers; backends that do I/O run it off the event loop."""
+        return self.get(session_id)
+
+    async def asave(self, session_id: str, session: dict) -> None:
+        """save() for async callers; backends that do I/O run it off the event loop."""
+        self.save(session_id, session)
+
+    def append_history(self, session_id: str, entry: dict) -> None:
+        """
+        Append one entry to a session's history. The session is re-read first,
+        so changes saved since the caller's own get() (e.g. a browse step during
+        a long AI answer) are kept.
+        """
+        session = self.get(session_id)
+        if session is not None:
+            session.setdefault("history", []).append(entry)
+            self.save(session_id, session)
+
+    async def aappend_history(self, session_id: str, entry: dict) -> None:
+        """append_history() for async callers."""
+        self.append_history(session_id, entry)
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Drop expired sessions and enforce max_sessions. Returns how many were dropped."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Thread-safe session dict with TTL + LRU eviction."""
+
+    def __init__(self, max_sessions: int = 50_000, idle_ttl: float = 3600.0, max_history: int = 50):
+        super().__init__(max_sessions, idle_ttl, max_history)
+        # session_id -> (last_access, session); ordered oldest access first
+        self._sessions: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _store(self, session_id: str, session: dict) -> None:
+        """Insert or refresh a session as most recently used. Caller holds the lock."""
+        size = _estimate_bytes(session)
+        self._total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+        self._sessions[session_id] = (time.monotonic(), session)
+        self._sessions.move_to_end(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        """Remove a session. Caller holds the lock."""
+        self._sessions.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+
+    def create(self, session_id: str, session: dict) -> None:
+        with self._lock:
+            self._store(session_id, session)
+            while len(self._sessions) > self.max_sessions:
+                oldest = next(iter(self._sessions))
+                self._drop(oldest)
+                self.evicted += 1
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Return the session (marking it as used), or None if unknown or idle too long."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._sessions.get(session_id)
+            if item is None:
+                return None
+            last_access, session = item
+            if now - last_access > self.idle_ttl:
+                self._drop(session_id)
+                self.expired += 1
+                return None
+            self._sessions[session_id] = (now, session)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session_id: str, session: dict) -> None:
+        self._trim_history(session)
+        with self._lock:
+            if session_id in self._sessions:
+                self._store(session_id, session)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._drop(session_id)
+
+    def sweep(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        removed = 0
+        with self._lock:
+            # Oldest access first, so stop at the first live session
+            while self._sessions:
+                session_id, (last_access, _) = next(iter(self._sessions.items()))
+                if last_access >= cutoff:
+                    break
+                self._drop(session_id)
+                removed += 1
+            self.expired += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "live_sessions": len(self._sessions),
+            "approx_bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite database in WAL mode, so every worker process on the
+    host sees the same sessions. Session bodies are compact JSON, zlib-
+    compressed when large.
+
+    New sessions are written through immediately. Updates and last-access
+    touches are buffered and flushed in one transaction every
+    `flush_interval` seconds by a writer thread (0 = write-through); reads in
+    the same process see buffered updates, other processes see them after
+    the flush. Reads use their own connection, so (WAL readers never wait
+    for writers) a flush stuck behind another process's write lock does not
+    hold them up; async callers should use aget()/asave().
+    """
+
+    COMPRESS_OVER = 1024  # bytes
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 50_000,
+        idle_ttl: float = 3600.0,
+        max_history: int = 50,
+        flush_interval: float = 0.05,
+    ):
+        super().__init__(max_sessions, idle_ttl, max_history)
+        self.path = path
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._read_conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._read_conn.execute("PRAGMA query_only=1")
+        self._lock = threading.Lock()  # the write buffers
+        self._write_lock = threading.Lock()  # self._conn
+        self._read_lock = threading.Lock()  # self._read_conn
+        self._update_lock = threading.Lock()  # append_history() read-modify-writes
+        self._writes: dict[str, tuple[bytes, float]] = {}
+        self._touches: dict[str, float] = {}
+        # Buffers taken by a flush that has not committed yet, still visible to reads
+        self._flushing: tuple[dict, dict] = ({}, {})
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._writer = threading.Thread(target=self._flush_loop, name="session-writer", daemon=True)
+            self._writer.start()
+
+    # ─── Serialisation ────────────────────────────────────────────────────────
+
+    def _encode(self, session: dict) -> bytes:
+        raw = _to_json(session)
+        if len(raw) > self.COMPRESS_OVER:
+            return b"z" + zlib.compress(raw, 1)
+        return b"j" + raw
+
+    @staticmethod
+    def _decode(data: bytes) -> dict:
+        body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        return json.loads(body)
+
+    # ─── Write buffer ─────────────────────────────────────────────────────────
+
+    def _flush_locked(self) -> None:
+        """Commit the buffered writes and touches. Caller holds the write lock (not the buffer lock)."""
+        with self._lock:
+            if not self._writes and not self._touches:
+                return
+            writes, touches = self._writes, self._touches
+            self._writes, self._touches = {}, {}
+            self._flushing = (writes, touches)
+        try:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sessions (id, data, last_access) VALUES (?, ?, ?)",
+                    [(sid, data, ts) for sid, (data, ts) in writes.items()],
+                )
+                self._conn.executemany(
+                    "UPDATE sessions SET last_access = MAX(last_access, ?) WHERE id = ?",
+                    [(ts, sid) for sid, ts in touches.items() if sid not in writes],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        finally:
+            with self._lock:
+                self._flushing = ({}, {})
+
+    def flush(self) -> None:
+        with self._write_lock:
+            self._flush_locked()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"⚠️ Session flush failed: {e}")
+
+    def _after_write(self) -> None:
+        """Write-through mode: flush immediately. Caller must not hold the buffer lock."""
+        if self._writer is None:
+            self.flush()
+
+    # ─── SessionStore interface ───────────────────────────────────────────────
+
+    def _evict_locked(self) -> int:
+        """Delete the least recently used sessions beyond max_sessions. Caller holds the write lock."""
+        evicted = self._conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            " SELECT id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        ).rowcount
+        self.evicted += evicted
+        return evicted
+
+    def create(self, session_id: str, session: dict) -> None:
+        # Written through so the next request can land on any worker, and the
+        # session cap enforced at once rather than at the next sweep
+        with self._lock:
+            self._writes[session_id] = (self._encode(session), time.time())
+        with self._write_lock:
+            self._flush_locked()
+            self._evict_locked()
+
+    def get(self, session_id: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            pending = self._writes.get(session_id) or self._flushing[0].get(session_id)
+            touched = max(self._touches.get(session_id, 0.0), self._flushing[1].get(session_id, 0.0))
+        if pending is not None:
+            data = pending[0]
+        else:
+            with self._read_lock:
+                row = self._read_conn.execute(
+                    "SELECT data, last_access FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            data, last_access = row
+            if now - max(last_access, touched) > self.idle_ttl:
+                # Idle too long; the sweeper deletes the row
+                return None
+        with self._lock:
+            self._touches[session_id] = now
+        self._after_write()
+        return self._decode(data)
+
+    async def aget(self, session_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    def save(self, session_id: str, session: dict) -> None:
+        self._trim_history(session)
+        data = self._encode(session)
+        with self._lock:
+            self._writes[session_id] = (data, time.time())
+        self._after_write()
+
+    async def asave(self, session_id: str, session: dict) -> None:
+        await asyncio.to_thread(self.save, session_id, session)
+
+    def append_history(self, session_id: str, entry: dict) -> None:
+        # One read-modify-write at a time in this process; other processes'
+        # changes are seen once their writer has flushed them
+        with self._update_lock:
+            super().append_history(session_id, entry)
+
+    async def aappend_history(self, session_id: str, entry: dict) -> None:
+        await asyncio.to_thread(self.append_history, session_id, entry)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._writes.pop(session_id, None)
+            self._touches.pop(session_id, None)
+        with self._write_lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def sweep(self) -> int:
+        with self._write_lock:
+            self._flush_locked()
+            expired = self._conn.execute(
+                "DELETE FROM sessions WHERE last_access < ?", (time.time() - self.idle_ttl,)
+            ).rowcount
+            evicted = self._evict_locked()
+        self.expired += expired
+        return expired + evicted
+
+    def stats(self) -> dict:
+        with self._read_lock:
+            count, total = self._read_conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "live_sessions": count,
+            "approx_bytes": total,
+            "max_sessions": self.max_sessions,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+        self._conn.close()
+        self._read_conn.close()
+
+
+def create_store(backend: str = "memory", **kwargs) -> SessionStore:
+    """Build the session store selected by `backend` ("memory" or "sqlite")."""
+    if backend == "memory":
+        kwargs.pop("path", None)
+        kwargs.pop("flush_interval", None)
+        return InMemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    raise ValueError(f"Unknown session backend: {backend!r}")
+
+
+async def run_sweeper(store: SessionStore, interval: float = 60.0) -> None:
+    """Periodically expire idle sessions; run as a background task until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        removed = await asyncio.to_thread(store.sweep)
+        if removed:
+            print(f"🧹 Dropped {removed} idle or excess sessions ({store.stats()['live_sessions']} live).")
@@ -0,0 +1,106 @@
+"""
+Single-flight — coalesces concurrent identical requests onto one upstream
+computation. The first caller for a key starts a producer task that
+publishes items to a Broadcast; every caller (the first included)
+subscribes and sees all items from the start, so late joiners get a full
+replay and streaming output fans out to everyone as it arrives.
+
+The producer runs as its own task: a caller disconnecting does not cancel
+the work the others are waiting on.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Optional
+
+
+class Broadcast:
+    """Replayable, append-only fan-out of one producer's items to any number of subscribers."""
+
+    def __init__(self):
+        self._items: list = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, item: Any) -> None:
+        self._items.append(item)
+        self._notify()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """End the stream; subscribers re-raise `error` after the items published so far."""
+        self._done = True
+        self._error = error
+        self._notify()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    async def wait_first(self) -> None:
+        """Wait for the first item; re-raises the producer's error if it failed before publishing any."""
+        while not self._items and not self._done:
+            await self._changed.wait()
+        if not self._items and self._error is not None:
+            raise self._error
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        i = 0
+        while True:
+            while i < len(self._items):
+                item = self._items[i]
+                i += 1
+                yield item
+            if self._done:
+                if self._error is not None:
+                    raise self._error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Registry of in-flight Broadcasts by key."""
+
+    def __init__(self):
+        self._flights: dict[Hashable, Broadcast] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def join(self, key: Hashable, produce: Callable[[Broadcast], Awaitable[None]]) -> tuple[Broadcast, bool]:
+        """
+        Return (flight, leader). If `key` is already in flight, join it;
+        otherwise start `produce(flight)` as a task and become its leader.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight, False
+
+        flight = Broadcast()
+        self._flights[key] = flight
+        self.started += 1
+
+        async def run() -> None:
+            try:
+                await produce(flight)
+                flight.close()
+            except BaseException as e:
+                flight.close(e if isinstance(e, Exception) else RuntimeError("request was cancelled"))
+                if not isinstance(e, Exception):
+                    raise
+            finally:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+        flight.task = asyncio.create_task(run())
+        return flight, True
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "started": self.started, "coalesced": self.coalesced}
@@ -0,0 +1,100 @@
+"""
+Request tracing — a per-request record of where the time went, carried in a
+context variable so any layer (main, knowledge_store, metrics) can add to
+it without threading it through call signatures.
+
+The HTTP middleware in main.py starts a trace for each request, returns it
+as a `Server-Timing` header (visible in the browser's dev tools) with an
+`X-Request-ID`, and prefixes log lines with that id via log().
+"""
+
+import contextvars
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestTrace:
+    """Stage durations for one request, in first-seen order; repeated stages add up."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.handler_done: Optional[float] = None
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def mark_handler_done(self) -> None:
+        """Called when the endpoint has built its result; the rest is serialisation."""
+        self.handler_done = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        """Stage durations in milliseconds."""
+        return {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header value, ending with the total so far."""
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reuse a well-formed incoming X-Request-ID (e.g. from the proxy), else mint one."""
+    if incoming and _REQUEST_ID_RE.match(incoming):
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+def start(request_id: str) -> tuple[RequestTrace, contextvars.Token]:
+    trace = RequestTrace(request_id)
+    return trace, _current.set(trace)
+
+
+def finish(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add a stage duration to the current request's trace, if there is one."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def mark_handler_done() -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.mark_handler_done()
+
+
+@contextmanager
+def span(stage: str):
+    """Time the `with` block into the current trace only (no Prometheus series)."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start_time)
+
+
+def log(message: str) -> None:
+    """print() with the current request id prefixed, so log lines can be matched to a request."""
+    trace = _current.get()
+    print(f"[{trace.request_id}] {message}" if trace is not None else message)
@@ -0,0 +1,74 @@
+"""
+In-process Vector Index — brute-force cosine search over a contiguous,
+pre-normalised float32 matrix. At knowledge-base scale (~100 entries) a single
+matrix-vector product is far cheaper than a round-trip through Chroma.
+"""
+
+import numpy as np
+
+
+class MemoryVectorIndex:
+    """Immutable top-k cosine index over a fixed set of (id, embedding) pairs."""
+
+    def __init__(self, ids: list[str], embeddings):
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise ValueError("embeddings must be a 2-D array with one row per id")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        matrix.setflags(write=False)
+
+        self.ids = tuple(ids)
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query_embedding, n_results: int = 5) -> list[tuple[str, float]]:
+        """
+        Return up to n_results (id, score) tuples, best first. Scores use the
+        same scale as the Chroma backend: 1 - cosine_distance / 2.
+        """
+        return self.search_many([query_embedding], n_results)[0]
+
+    def search_many(self, query_embeddings, n_results: int = 5) -> list[list[tuple[str, float]]]:
+        """Vectorised search(): one matrix-matrix product for all queries."""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim != 2:
+            raise ValueError("query_embeddings must be a 2-D array")
+        if not self.ids or n_results <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        cosines = queries @ self.matrix.T  # (n_queries, n_docs)
+        k = min(n_results, len(self.ids))
+        if k < len(self.ids):
+            top = np.argpartition(-cosines, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(self.ids)), cosines.shape)
+        top_scores = np.take_along_axis(cosines, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        scores = np.round((1.0 + top_scores.astype(np.float64)) / 2, 4)
+
+        return [
+            [(self.ids[i], float(score)) for i, score in zip(row, row_scores)]
+            for row, row_scores in zip(top.tolist(), scores.tolist())
+        ]
+
+    def scores_for(self, query_embedding, ids: list[str]) -> dict[str, float]:
+        """Scores (same scale as search()) of specific ids against one query."""
+        rows = [(doc_id, self.positions[doc_id]) for doc_id in ids if doc_id in self.positions]
+        if not rows:
+            return {}
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        cosines = self.matrix[[i for _, i in rows]] @ query
+        return {doc_id: round((1.0 + float(c)) / 2, 4) for (doc_id, _), c in zip(rows, cosines)}